@@ -0,0 +1,634 @@
+"""Offline benchmark for infobot.py.
+
+Runs whole cycles of the bot (gathering the data with get_data and posting
+the thread the way main does) against a local stand-in server that serves
+fixtures for every website the bot reads, and a fake Twitter api that only
+records the posts. Nothing leaves the machine.
+
+Each cycle reports its wall time, the requests made, the bytes read and the
+api calls, so every performance change can be checked against a repeatable
+number.
+
+With --parse, it instead times the index patterns over every index page,
+recorded ones included, and a pathological page, against the patterns used
+before the single-pass one.
+
+With --startup, it instead measures how long a fresh process takes to
+import the bot and load the modules every run needs, once per cycle.
+
+With --schedule, it instead runs the Scheduler on a fake clock through DST
+transitions and midnight, checking every run against the expected instant.
+
+Usage: python3 benchmark.py [--cycles N] [--latency SECONDS] [--failure-rate RATE] [--fail-host HOST] [--fixtures DIRECTORY] [--json] [--metrics] [--currency-converter] [--parse] [--startup] [--schedule]"""
+
+
+# IMPORTING MODULES FROM THE STANDARD LIBRARY
+
+import argparse
+import datetime
+import hashlib
+import http.server
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import types
+from urllib.parse import parse_qs, urlsplit, urlunsplit
+
+# IMPORTING THE BOT AND ITS THIRD-PARTY MODULES
+
+import requests
+
+import infobot
+
+
+# FIXTURES
+
+
+def pad(content, size, position=0.3):
+    """
+    Takes some html, a total size and a relative position and returns the html surrounded by filler markup.
+
+    :param content: String with the relevant html.
+    :param size: Approximate size of the page in characters.
+    :param position: Where the content is placed, from 0 (start) to 1 (end). (0.3 as default.)
+
+    :return: String with the whole page.
+    """
+    filler_line = '<div class="filler"><p>Lorem ipsum dolor sit amet, consectetur adipiscing elit.</p></div>\n'
+    filler = filler_line * max(size // len(filler_line), 1)
+    cut = int(len(filler) * position)
+
+    return "<html><body>\n" + filler[:cut] + content + "\n" + filler[cut:] + "</body></html>\n"
+
+
+def get_synthetic_fixtures():
+    """
+    Returns pages shaped like the ones the bot scrapes, for every url in infobot's tables.
+
+    :return: Dict of (host, path) -> page string.
+    """
+    fixtures = dict()
+
+    for index, link in enumerate(infobot.CURRENCIES.values()):
+        url = urlsplit(link)
+        content = f'<input type="text" id="nacional" value="{5 + index},{index:0>2}" />'
+        fixtures[(url.netloc, url.path)] = pad(content, 120_000)
+
+    for index, link in enumerate(infobot.INDEXES.values()):
+        url = urlsplit(link)
+        content = (
+            f'<span class="arial_26 inlineblock pid-{index}-last" id="last_last" dir="ltr">1{index}.234,56</span>\n'
+            f'<span class="arial_20 greenFont  pid-{index}-pc" dir="ltr">+1{index},23</span>\n'
+            f'<span class="arial_20 greenFont  pid-{index}-pcp parentheses" dir="ltr">+0,{index}5%</span>'
+        )
+        fixtures[(url.netloc, url.path)] = pad(content, 400_000)
+
+    headlines = [f"Headline number {index} about markets, politics and technology" for index in range(30)]
+
+    fixtures[("economist.com", "/")] = pad("\n".join(
+        f'<a class="headline-link" href="/briefing/2026/{index}"><span class="headline">{title}</span></a>'
+        for index, title in enumerate(headlines)
+    ), 250_000, 0.5)
+    fixtures[("www.wsj.com", "/")] = pad("\n".join(
+        f'<a class="" href="https://www.wsj.com/articles/{index}"><span class="WSJTheme--headlineText--He1ANr9C ">{title}</span></a>'
+        for index, title in enumerate(headlines)
+    ), 500_000, 0.5)
+    fixtures[("www.oantagonista.com", "/")] = pad("\n".join(
+        f'<div class="article_link">\n<a href="https://www.oantagonista.com/brasil/{index}" title="{title}" class="link_post">'
+        for index, title in enumerate(headlines)
+    ), 200_000, 0.5)
+    fixtures[("insurgere.com.br", "/")] = pad("\n".join(
+        f'<h2 class="entry-title"><a href="https://insurgere.com.br/{index}" rel="bookmark">{title}</a></h2>'
+        for index, title in enumerate(headlines)
+    ), 150_000, 0.5)
+    fixtures[("news.ycombinator.com", "/news")] = pad("\n".join(
+        f"<tr class='athing' id='{index}'><td>{index}.</td>\n"
+        f'<td class="title"><a href="https://example.com/{index}" class="storylink">{title}</a></td></tr>\n'
+        f'<tr><td class="subtext"><span class="score">{(index * 37) % 500} points</span></td></tr>'
+        for index, title in enumerate(headlines)
+    ), 40_000, 0.5)
+
+    return fixtures
+
+
+def load_fixtures(directory):
+    """
+    Takes a directory of recorded pages and returns them, on top of the synthetic ones.
+
+    The pages are read from DIRECTORY/<host><path>, with "index.html" standing for a path ending
+    in "/", so a page saved with "wget -x" is found where it is.
+
+    :param directory: Desired directory path, or None for the synthetic fixtures only.
+
+    :return: Dict of (host, path) -> page string.
+    """
+    fixtures = get_synthetic_fixtures()
+
+    if directory is None:
+        return fixtures
+
+    for host, path in list(fixtures):
+        file_path = os.path.join(directory, host, path.lstrip("/"))
+        if path.endswith("/"):
+            file_path = os.path.join(file_path, "index.html")
+        if os.path.isfile(file_path):
+            with open(file_path, encoding="utf-8", errors="replace") as file:
+                fixtures[(host, path)] = file.read()
+
+    return fixtures
+
+
+# LOCAL STAND-IN SERVER
+
+
+class Statistics:
+    """Thread safe counters of a benchmark cycle."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Zeroes every counter."""
+        with self._lock:
+            self.requests = 0
+            self.not_modified = 0
+            self.failures_injected = 0
+            self.bytes_read = 0
+            self.api_calls = 0
+
+    def add(self, counter, amount=1):
+        """Takes a counter's name and adds the amount to it."""
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def as_dict(self):
+        """Returns the counters in a dict."""
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "not_modified": self.not_modified,
+                "failures_injected": self.failures_injected,
+                "bytes_read": self.bytes_read,
+                "api_calls": self.api_calls,
+            }
+
+
+def create_server(fixtures, statistics, latency=0.0, failure_rate=0.0, failing_hosts=()):
+    """
+    Takes the fixtures and the fault settings and starts the stand-in server in a background thread.
+
+    Pages are served with an ETag, so conditional requests get a 304. tinyurl's api answers with
+    a short url derived from the url given and currency converter's api with made up rates.
+
+    :param fixtures: Dict of (host, path) -> page string.
+    :param statistics: Statistics updated by the server.
+    :param latency: Seconds each response is delayed, with up to 50% of jitter. (0 as default.)
+    :param failure_rate: Probability of answering any request with a 503. (0 as default.)
+    :param failing_hosts: Hosts that always answer with a 503. (None as default.)
+
+    :return: The running http.server.ThreadingHTTPServer.
+    """
+    encoded_fixtures = {key: page.encode("utf-8") for key, page in fixtures.items()}
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            statistics.add("requests")
+            host = self.headers.get("Host", "").split(":")[0]
+            url = urlsplit(self.path)
+
+            if latency:
+                time.sleep(latency * random.uniform(0.5, 1.5))
+
+            if host in failing_hosts or random.random() < failure_rate:
+                statistics.add("failures_injected")
+                return self.respond(503, b"Service Unavailable")
+
+            if host == "tinyurl.com":
+                long_url = parse_qs(url.query).get("url", [""])[0]
+                return self.respond(200, b"https://tinyurl.com/" + hashlib.sha1(long_url.encode()).hexdigest()[:8].encode())
+
+            if host == "free.currconv.com":
+                pairs = parse_qs(url.query).get("q", [""])[0].split(",")
+                return self.respond(200, json.dumps({pair: 5 + index / 10 for index, pair in enumerate(pairs)}).encode())
+
+            body = encoded_fixtures.get((host, url.path or "/"))
+            if body is None:
+                return self.respond(404, b"Not Found")
+
+            etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+            if self.headers.get("If-None-Match") == etag:
+                statistics.add("not_modified")
+                return self.respond(304, b"", etag)
+
+            return self.respond(200, body, etag)
+
+        def respond(self, status, body, etag=None):
+            self.send_response(status)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            if etag is not None:
+                self.send_header("ETag", etag)
+            self.end_headers()
+            try:
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # The bot stopped reading early.
+
+        def log_message(self, format, *args):
+            pass
+
+    class Server(http.server.ThreadingHTTPServer):
+        daemon_threads = True
+
+        def handle_error(self, request, client_address):
+            pass  # Connections closed early by the bot are expected.
+
+    server = Server(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server
+
+
+class LocalAdapter(requests.adapters.HTTPAdapter):
+    """Transport adapter that sends every request to the stand-in server, keeping the original Host header, and counts the bytes read."""
+
+    def __init__(self, port, statistics, **kwargs):
+        self.port = port
+        self.statistics = statistics
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        url = urlsplit(request.url)
+        request.url = urlunsplit(("http", f"127.0.0.1:{self.port}", url.path or "/", url.query, ""))
+        request.headers["Host"] = url.netloc
+        response = super().send(request, **kwargs)
+
+        raw = response.raw
+        read = raw.read
+
+        def counting_read(*args, **read_kwargs):
+            data = read(*args, **read_kwargs)
+            self.statistics.add("bytes_read", len(data))
+            return data
+
+        raw.read = counting_read
+
+        return response
+
+
+# FAKE TWITTER API
+
+
+class FakeApi:
+    """Stands in for an authenticated Tweepy Api Object and records every post."""
+
+    rate_limit_errors = ()  # Never rate limited, so Tweepy is not loaded for it.
+
+    def __init__(self, statistics):
+        self.statistics = statistics
+        self.posts = list()
+        self.last_response = None
+        self._lock = threading.Lock()
+
+    def update_status(self, status, in_reply_to_status_id=None):
+        self.statistics.add("api_calls")
+        with self._lock:
+            self.posts.append((status, in_reply_to_status_id))
+            return types.SimpleNamespace(id=len(self.posts))
+
+    def verify_credentials(self, **kwargs):
+        self.statistics.add("api_calls")
+        return True
+
+
+# BENCHMARK
+
+
+def prepare_bot(port, statistics, state_directory):
+    """
+    Takes the stand-in server's port, the statistics and a directory and points the bot at them.
+
+    :param port: Port of the stand-in server.
+    :param statistics: Statistics updated by the adapter.
+    :param state_directory: Directory for the bot's caches, so the real ones are not touched.
+
+    :return: None
+    """
+    infobot.SHORT_URL_CACHE_FILE = os.path.join(state_directory, "short_urls.json")
+    infobot.RESPONSE_CACHE_DIRECTORY = os.path.join(state_directory, "response_cache")
+    infobot.LAST_KNOWN_GOOD_FILE = os.path.join(state_directory, "last_known_good.json")
+    infobot.QUOTE_HISTORY_DIRECTORY = os.path.join(state_directory, "quote_history")
+    infobot.RETRY_POLICY = infobot.RetryPolicy(base_delay=0.1, max_delay=1, deadline=10)
+
+    session = infobot.get_session()
+    adapter = LocalAdapter(port, statistics, pool_maxsize=infobot.MAX_CONNECTIONS_PER_HOST)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+
+def run_cycle(statistics, api, timezone="America/Cuiaba", CURRENCY_CONVERTER_KEY=""):
+    """
+    Takes the statistics and the fake api and runs one cycle, the same way main's scheduled run does.
+
+    :param statistics: Statistics, zeroed at the start.
+    :param api: FakeApi that receives the thread.
+    :param timezone: Timezone of the header. ("America/Cuiaba" as default.)
+    :param CURRENCY_CONVERTER_KEY: Key given to the bot. ("" as default, which scrapes every currency.)
+
+    :return: Dict with the cycle's numbers.
+    """
+    statistics.reset()
+    posts_before = len(api.posts)
+
+    started = time.perf_counter()
+    data = infobot.get_data(timezone=timezone, CURRENCY_CONVERTER_KEY=CURRENCY_CONVERTER_KEY)
+    gathered = time.perf_counter()
+
+    infobot.ThreadBuilder(api, "benchmark", infobot.PostingScheduler()).build(data[3], *data[:3])
+    finished = time.perf_counter()
+
+    return dict(
+        statistics.as_dict(),
+        gather_seconds=round(gathered - started, 3),
+        post_seconds=round(finished - gathered, 3),
+        wall_seconds=round(finished - started, 3),
+        tweets=len(api.posts) - posts_before,
+    )
+
+
+# PARSING
+
+
+# The three patterns get_stock_indexes used before the single-pass one, kept to compare with.
+LEGACY_INDEX_PATTERNS = [
+    re.compile(r"<span class=\"arial_26 inlineblock pid-\d+-last\" id=\"last_last\".*?>(?P<value>.*?)</span>"),
+    re.compile(r"<span class=(.*?)(green|red)Font(.*?)(?P<change>(\+|-)\d+(\.\d+)*,\d\d)(.*?)<\/span>"),
+    re.compile(r"<span class=(.*?)(green|red)Font(.*?)(?P<change_percentage>(\+|-)\d+(\.\d+)*,\d\d%)(.*?)<\/span>"),
+]
+
+
+def get_pathological_page():
+    """
+    Returns an index page whose lines are full of colored spans without numbers, the worst case for lazy groups.
+
+    :return: String with the page.
+    """
+    line = '<span class="arial_20 greenFont pid-0-pc" dir="ltr">n/a</span> ' * 100
+    content = (
+        '<span class="arial_26 inlineblock pid-0-last" id="last_last" dir="ltr">12.345,67</span>\n'
+        + (line + "\n") * 5
+        + '<span class="arial_20 redFont  pid-0-pc" dir="ltr">-1,23</span>\n'
+        + '<span class="arial_20 redFont  pid-0-pcp parentheses" dir="ltr">-0,45%</span>'
+    )
+
+    return pad(content, 100_000, 0.9)
+
+
+def measure_parsing(fixtures, repeats):
+    """
+    Takes the fixtures and times the legacy and the current index patterns over each index page, whole.
+
+    :param fixtures: Dict of (host, path) -> page string.
+    :param repeats: Times each page is searched. The fastest is reported.
+
+    :return: List of dicts with the page, its size, the milliseconds of each pattern set and whether they found the same values.
+    """
+    pages = [(name, fixtures[(urlsplit(link).netloc, urlsplit(link).path or "/")]) for name, link in infobot.INDEXES.items()]
+    pages.append(("pathological", get_pathological_page()))
+
+    reports = list()
+
+    for name, page in pages:
+        timings = dict()
+        found = dict()
+        for label, patterns in (("legacy", LEGACY_INDEX_PATTERNS), ("single_pass", infobot.INDEX_PATTERNS)):
+            best = float("inf")
+            for _ in range(repeats):
+                values = dict()
+                best = min(best, infobot.search_fields(page, patterns, values))
+            timings[label] = best
+            found[label] = values
+
+        reports.append(dict(
+            page=name,
+            kilobytes=len(page) // 1024,
+            legacy_ms=round(timings["legacy"] * 1000, 3),
+            single_pass_ms=round(timings["single_pass"] * 1000, 3),
+            same_values=found["legacy"] == found["single_pass"],
+        ))
+
+    return reports
+
+
+# STARTUP
+
+
+# Run in a fresh interpreter, so nothing is imported beforehand.
+STARTUP_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import infobot
+imported = time.perf_counter()
+loaded_at_import = sorted(name for name in ("requests", "tweepy", "pytz", "twilio.rest", "http.server") if name in sys.modules)
+infobot.requests.load()
+infobot.pytz.load()
+ready = time.perf_counter()
+infobot.tweepy.load()
+infobot.twilio_rest.load()
+integrations = time.perf_counter()
+print(json.dumps(dict(
+    import_seconds=round(imported - started, 4),
+    ready_seconds=round(ready - started, 4),
+    integrations_seconds=round(integrations - ready, 4),
+    loaded_at_import=",".join(loaded_at_import) or "-",
+)))
+"""
+
+
+def measure_startup(run):
+    """
+    Takes the run's number and starts a fresh interpreter that imports the bot, timing each step.
+
+    :param run: Number of the run, reported with it.
+
+    :return: Dict with the seconds to import the bot, to have the modules every run needs, to load the
+        optional integrations (Tweepy and Twilio) and for the whole process, and the heavy modules loaded by the import.
+    """
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-c", STARTUP_SCRIPT], cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True
+    )
+
+    return dict(json.loads(completed.stdout), run=run, process_seconds=round(time.perf_counter() - started, 4))
+
+
+# SCHEDULING
+
+
+class FakeClock:
+    """Stands in for the Scheduler's SystemClock. Its time only moves when it sleeps."""
+
+    def __init__(self, start):
+        self.current = start
+        self.elapsed = 0.0
+
+    def now(self):
+        return self.current
+
+    def monotonic(self):
+        return self.elapsed
+
+    def sleep(self, seconds):
+        self.current += datetime.timedelta(seconds=seconds)
+        self.elapsed += seconds
+
+
+def utc(text):
+    """Takes "YYYY-MM-DD HH:MM" in UTC and returns it as an aware datetime."""
+    return infobot.pytz.utc.localize(datetime.datetime.strptime(text, "%Y-%m-%d %H:%M"))
+
+
+# Each case starts the clock, adds the jobs, as (name, offset in seconds), and expects the runs, as
+# (job, UTC time it ran, UTC instant given to it), in order.
+SCHEDULE_CASES = [
+    dict(
+        case="ambiguous time",  # New York's clocks go back from 02:00 to 01:00 on 2026-11-01.
+        timezone="America/New_York", schedule=[(1, 30)], jobs=[("post", 0)], start="2026-10-31 12:00",
+        runs=[("post", "2026-11-01 05:30", "2026-11-01 05:30"), ("post", "2026-11-02 06:30", "2026-11-02 06:30")],
+    ),
+    dict(
+        case="nonexistent time",  # New York's clocks go forward from 02:00 to 03:00 on 2026-03-08.
+        timezone="America/New_York", schedule=[(2, 30)], jobs=[("post", 0)], start="2026-03-07 12:00",
+        runs=[("post", "2026-03-08 07:30", "2026-03-08 07:30"), ("post", "2026-03-09 06:30", "2026-03-09 06:30")],
+    ),
+    dict(
+        case="midnight",
+        timezone="America/Sao_Paulo", schedule=[(23, 50), (0, 10)], jobs=[("post", 0)], start="2026-06-01 02:00",
+        runs=[("post", "2026-06-01 02:50", "2026-06-01 02:50"), ("post", "2026-06-01 03:10", "2026-06-01 03:10"),
+              ("post", "2026-06-02 02:50", "2026-06-02 02:50")],
+    ),
+    dict(
+        case="prefetch before midnight",
+        timezone="America/Sao_Paulo", schedule=[(0, 5)], jobs=[("prefetch", -600), ("post", 0)], start="2026-06-01 02:00",
+        runs=[("prefetch", "2026-06-01 02:55", "2026-06-01 03:05"), ("post", "2026-06-01 03:05", "2026-06-01 03:05"),
+              ("prefetch", "2026-06-02 02:55", "2026-06-02 03:05")],
+    ),
+]
+
+
+def check_schedule(case):
+    """
+    Takes one of SCHEDULE_CASES and runs its jobs on a FakeClock until the expected amount of runs.
+
+    :param case: Desired case.
+
+    :return: Dict with the case's name, whether every run was the expected one and the runs, formatted.
+    """
+    clock = FakeClock(utc(case["start"]))
+    scheduler = infobot.Scheduler(clock=clock)
+    runs = list()
+
+    for name, offset in case["jobs"]:
+        callback = lambda instant, name=name: runs.append((name, f"{clock.now():%Y-%m-%d %H:%M}", f"{instant:%Y-%m-%d %H:%M}"))
+        scheduler.add_daily(name, case["schedule"], case["timezone"], callback, offset)
+
+    while len(runs) < len(case["runs"]):
+        scheduler.sleep_until(scheduler.next_run())
+        scheduler.run_pending()
+
+    return dict(
+        case=case["case"],
+        ok=runs[:len(case["runs"])] == case["runs"],
+        runs=", ".join(f"{name} {ran}>{instant[11:]}" for name, ran, instant in runs),
+    )
+
+
+def main():
+    """Parses the command line, runs the benchmark and prints the report."""
+    parser = argparse.ArgumentParser(description="Offline benchmark of infobot's cycle.")
+    parser.add_argument("--cycles", type=int, default=3, help="Cycles to run. The first one starts with empty caches.")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds each response is delayed.")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Probability of a 503 on any request.")
+    parser.add_argument("--fail-host", action="append", default=list(), help="Host that always answers with a 503.")
+    parser.add_argument("--fixtures", help="Directory with recorded pages, laid out as <host>/<path>.")
+    parser.add_argument("--json", action="store_true", help="Print one json object per cycle instead of a table.")
+    parser.add_argument("--metrics", action="store_true", help="Print the bot's own metrics, in Prometheus' format, at the end.")
+    parser.add_argument("--currency-converter", action="store_true", help="Get the currencies from currency converter's api, scraping only the ones it lacks.")
+    parser.add_argument("--parse", action="store_true", help="Time the index patterns over each index page instead, searching it once per cycle.")
+    parser.add_argument("--startup", action="store_true", help="Measure the startup of a fresh process instead, once per cycle.")
+    parser.add_argument("--schedule", action="store_true", help="Check the Scheduler's runs on a fake clock across DST transitions and midnight instead.")
+    arguments = parser.parse_args()
+
+    if arguments.schedule:
+        reports = [check_schedule(case) for case in SCHEDULE_CASES]
+        for report in reports:
+            if arguments.json:
+                print(json.dumps(report))
+            else:
+                print(f"{report['case']:>25}  {'ok' if report['ok'] else 'FAILED':>6}  {report['runs']}")
+
+        sys.exit(0 if all(report["ok"] for report in reports) else 1)
+
+    if arguments.parse:
+        columns = ["page", "kilobytes", "legacy_ms", "single_pass_ms", "same_values"]
+        if not arguments.json:
+            print("  ".join(f"{column:>17}" for column in columns))
+
+        for report in measure_parsing(load_fixtures(arguments.fixtures), arguments.cycles):
+            if arguments.json:
+                print(json.dumps(report))
+            else:
+                print("  ".join(f"{str(report[column]):>17}" for column in columns))
+
+        return
+
+    if arguments.startup:
+        columns = ["run", "import_seconds", "ready_seconds", "integrations_seconds", "process_seconds", "loaded_at_import"]
+        if not arguments.json:
+            print("  ".join(f"{column:>20}" for column in columns))
+
+        for run in range(1, arguments.cycles + 1):
+            report = measure_startup(run)
+            if arguments.json:
+                print(json.dumps(report))
+            else:
+                print("  ".join(f"{report[column]:>20}" for column in columns))
+
+        return
+
+    statistics = Statistics()
+    server = create_server(load_fixtures(arguments.fixtures), statistics, arguments.latency, arguments.failure_rate, set(arguments.fail_host))
+    api = FakeApi(statistics)
+
+    with tempfile.TemporaryDirectory() as state_directory:
+        prepare_bot(server.server_port, statistics, state_directory)
+
+        columns = ["cycle", "wall_seconds", "gather_seconds", "post_seconds", "requests", "not_modified", "failures_injected", "bytes_read", "api_calls", "tweets"]
+        if not arguments.json:
+            print("  ".join(f"{column:>17}" for column in columns))
+
+        for cycle in range(1, arguments.cycles + 1):
+            report = dict(run_cycle(statistics, api, CURRENCY_CONVERTER_KEY="benchmark" if arguments.currency_converter else ""), cycle=cycle)
+            if arguments.json:
+                print(json.dumps(report))
+            else:
+                print("  ".join(f"{report[column]:>17}" for column in columns))
+
+    server.shutdown()
+
+    if arguments.metrics:
+        print()
+        print(infobot.METRICS.render(), end="")
+
+
+if __name__ == "__main__":
+    main()
@@ -16,46 +16,93 @@ No copyright applies."""
 
 # IMPORTING MODULES FROM THE STANDARD LIBRARY
 
+import codecs
+import collections
+import concurrent.futures
 import contextlib
 import datetime
+import functools
+import hashlib
+import heapq
 import html
+import importlib
+import json
+import math
+import mmap
+import os
+import queue
+import random
 import re
+import sqlite3
+import struct
+import threading
 import time
-import urllib
-from urllib.parse import urlencode
-from urllib.request import urlopen
+import types
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urljoin, urlsplit
 
-# CHECKING IF THE REQUIRED THIRD-PARTY MODULES ARE INSTALLED AND IMPORTING THEM
+# THIRD-PARTY MODULES, IMPORTED ON FIRST USE
 
-try:
-    import requests
-except ModuleNotFoundError:
-    raise Exception("Requests not installed. (pip3 install requests)")
 
-try:
-    import tweepy
-except ModuleNotFoundError:
-    raise Exception("Tweepy not installed. (pip3 install tweepy)")
+class LazyModule:
+    """
+    Stands for a third-party module and imports it the first time one of its attributes is used.
+
+    Startup only pays for the modules a run actually needs, so Twilio is never loaded without text
+    messages and Tweepy never in dry runs. A missing module fails when it is first needed instead
+    of at import time.
+    """
+
+    def __init__(self, name, title, package):
+        """
+        Takes the module's name, its display name and its package.
+
+        :param name: Importable name, such as "twilio.rest".
+        :param title: Name shown in the error message, such as "Twilio".
+        :param package: Name given to pip, such as "twilio".
+        """
+        self._name = name
+        self._title = title
+        self._package = package
+        self._module = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """
+        Imports the module, if it was not imported yet, and returns it.
+
+        :return: The module.
+        """
+        with self._lock:
+            if self._module is None:
+                started = time.perf_counter()
+                try:
+                    self._module = importlib.import_module(self._name)
+                except ModuleNotFoundError:
+                    raise Exception(f"{self._title} not installed. (pip3 install {self._package})")
+                METRICS.observe("import_seconds", time.perf_counter() - started, module=self._name)
+
+            return self._module
 
-try:
-    import pytz
-except ModuleNotFoundError:
-    raise Exception("Pytz not installed. (pip3 install pytz)")
+    def __getattr__(self, attribute):
+        return getattr(self.load(), attribute)
 
-try:
-    from twilio.rest import Client
-except ModuleNotFoundError:
-    raise Exception("Twilio not installed. (pip3 install twilio)")
+
+requests = LazyModule("requests", "Requests", "requests")
+tweepy = LazyModule("tweepy", "Tweepy", "tweepy")
+pytz = LazyModule("pytz", "Pytz", "pytz")
+twilio_rest = LazyModule("twilio.rest", "Twilio", "twilio")
+twilio_http_client = LazyModule("twilio.http.http_client", "Twilio", "twilio")
 
 
 # MAIN FUNCTION
 
 
 def main(
-        username, timezone, API_KEY, API_SECRET_KEY, ACCESS_TOKEN, ACCESS_TOKEN_SECRET, CURRENCY_CONVERTER_KEY, text_message=False, TWILIO_ACCOUNT_SID="", TWILIO_AUTH_TOKEN="", TWILIO_NUMBER="", MOBILE_NUMBER="",
+        username, timezone, API_KEY, API_SECRET_KEY, ACCESS_TOKEN, ACCESS_TOKEN_SECRET, CURRENCY_CONVERTER_KEY, text_message=False, TWILIO_ACCOUNT_SID="", TWILIO_AUTH_TOKEN="", TWILIO_NUMBER="", MOBILE_NUMBER="", prefetch_lead=3 * 60, quotes_refresh_lead=20, news_sources=None, metrics_log=None, metrics_port=None, dry_run=False, alert_file=None, alert_webhook=None,
 ):
     """
-    Runs the program.
+    Runs the program for a single account.
 
     :param username: Twitter account username without @.
     :param timezone: Desired timezone. (Timezones available at https://stackoverflow.com/q/13866926.)
@@ -63,591 +110,3333 @@ def main(
     :param API_SECRET_KEY: Twitter's Api secret key.
     :param ACCESS_TOKEN: Twitter's Api access token.
     :param ACCESS_TOKEN_SECRET: Twitter's Api access token secret.
+    :param prefetch_lead: Seconds before each run the data is gathered. (180 as default.)
+    :param quotes_refresh_lead: Seconds before each run the quotes are gathered again, or None to disable it. (20 as default.)
+    :param news_sources: Optional list of NEWS_SOURCES keys to be tweeted. (ENABLED_NEWS_SOURCES as default.)
+    :param metrics_log: Optional path of a json lines log of every stage's metrics. (None as default.)
+    :param metrics_port: Optional local port serving the metrics in Prometheus' format at /metrics. (None as default.)
+    :param dry_run: Whether the threads are printed instead of tweeted, without loading Tweepy. (False as default.)
+    :param alert_file: Optional path of a file the alerts are appended to. (None as default.)
+    :param alert_webhook: Optional url the alerts are posted to as json. (None as default.)
 
     :return: None
     """
+    profile = Profile(username, timezone, API_KEY, API_SECRET_KEY, ACCESS_TOKEN, ACCESS_TOKEN_SECRET, news_sources=news_sources)
+
+    run_profiles(
+        [profile], CURRENCY_CONVERTER_KEY, text_message, TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_NUMBER, MOBILE_NUMBER,
+        prefetch_lead, quotes_refresh_lead, metrics_log, metrics_port, dry_run, alert_file, alert_webhook,
+    )
+
+
+def run_profiles(
+        profiles, CURRENCY_CONVERTER_KEY, text_message=False, TWILIO_ACCOUNT_SID="", TWILIO_AUTH_TOKEN="", TWILIO_NUMBER="", MOBILE_NUMBER="", prefetch_lead=3 * 60, quotes_refresh_lead=20, metrics_log=None, metrics_port=None, dry_run=False, alert_file=None, alert_webhook=None,
+):
+    """
+    Runs the program for many accounts in one process.
+
+    Every profile posts on its own thread, with its own clients and rate limit, while the sources
+    are gathered once for all the profiles whose runs fall close together.
+
+    :param profiles: List of Profile.
+    :param CURRENCY_CONVERTER_KEY: Currency converter's Api key.
+    :param text_message: Whether a text message is sent if it fails or a source is degraded. (False as default.)
+    :param prefetch_lead: Seconds before each run the data is gathered. (180 as default.)
+    :param quotes_refresh_lead: Seconds before each run the quotes are gathered again, or None to disable it. (20 as default.)
+    :param metrics_log: Optional path of a json lines log of every stage's metrics. (None as default.)
+    :param metrics_port: Optional local port serving the metrics in Prometheus' format at /metrics. (None as default.)
+    :param dry_run: Whether the threads are printed instead of tweeted, without loading Tweepy. (False as default.)
+    :param alert_file: Optional path of a file the alerts are appended to. (None as default.)
+    :param alert_webhook: Optional url the alerts are posted to as json. (None as default.)
 
-    WAIT_BEFORE_NEXT_TWEET = 5
+    :return: None
+    """
 
     ERROR_MESSAGE = """There was an error while executing infobot.py:"""
 
-    try:
-        schedule = request_schedule_input()
+    METRICS.log_path = metrics_log
+    if metrics_port is not None:
+        METRICS.serve(metrics_port)
+
+    clients = [
+        ClientManager(*profile.credentials, TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, profile.username if dry_run else None)
+        for profile in profiles
+    ]
+
+    if text_message:
+        ALERTS.sinks.append(TwilioSink(clients[0], TWILIO_NUMBER, MOBILE_NUMBER))
+    if alert_file is not None:
+        ALERTS.sinks.append(FileSink(alert_file))
+    if alert_webhook is not None:
+        ALERTS.sinks.append(WebhookSink(alert_webhook))
+
+    try:
+        print("Checking credentials...")
+        for profile, profile_clients in zip(profiles, clients):
+            profile_clients.verify(twilio=text_message and profile is profiles[0])
+
+        for profile in profiles:
+            if profile.schedule is None:
+                profile.schedule = load_schedule(profile.username)
+
+        scheduler = Scheduler()
+        fetcher = SharedFetcher()
+
+        runners = list()
+
+        def on_error(profile, error):
+            print(f"@{profile.username} failed, stopping it: {error!r}")
+            ALERTS.alert(f"profile/{profile.username}", f"@{profile.username} stopped after an error:\n\n{error}")
+            if not any(runner.running for runner in runners):
+                scheduler.stop(error)
+
+        os.makedirs(JOURNAL_DIRECTORY, exist_ok=True)
+
+        for profile, profile_clients in zip(profiles, clients):
+            seen = SeenStore(SEEN_NEWS_FILE, profile.username) if profile.only_new_news else None
+            prefetcher = Prefetcher(profile.timezone, CURRENCY_CONVERTER_KEY, profile.news_sources, profile.sections, fetcher, seen)
+            journal = ThreadJournal(os.path.join(JOURNAL_DIRECTORY, profile.username + ".json"))
+            runners.append(ProfileRunner(profile, profile_clients, prefetcher, on_error, journal))
+
+        for runner in runners:
+            runner.resume()
+            runner.schedule(scheduler, prefetch_lead, quotes_refresh_lead)
+            runner.start()
+
+        scheduler.run_forever()
+    except Exception as error:
+        ALERTS.alert("fatal", ERROR_MESSAGE + "\n\n" + str(error))
+        if not ALERTS.flush():
+            print("Stopping before every alert could be sent.")
+        raise error
+
+
+# DEFINITIONS
+
+
+# UTILITIES
+
+
+class CouldNotConnectError(Exception):
+    """Raised when there was a problem with the connection."""
+
+
+class CouldNotParseError(Exception):
+    """Raised when an expected value was not found in a page."""
+
+
+# INSTRUMENTATION
+
+
+class Metrics:
+    """
+    Counters and timings of every stage of the bot.
+
+    Each observation can be appended to a json lines log, and the totals are rendered in
+    Prometheus' text format, optionally served on a local port.
+    """
+
+    def __init__(self, log_path=None):
+        """
+        Takes the path of the json lines log.
+
+        :param log_path: Path of the log, appended to. (None as default, which disables the log.)
+        """
+        self.log_path = log_path
+        self._counters = collections.defaultdict(float)  # (name, labels) -> total
+        self._summaries = dict()  # (name, labels) -> [count, sum, max]
+        self._lock = threading.Lock()
+
+    def log(self, event, **fields):
+        """
+        Takes an event name and its fields and appends them to the json lines log, if enabled.
+
+        :param event: Name of the event.
+        :param fields: Json serializable values.
+
+        :return: None
+        """
+        if self.log_path is None:
+            return
+
+        line = json.dumps(dict(time=round(time.time(), 3), event=event, **fields), default=str)
+
+        with self._lock:
+            with open(self.log_path, "a", encoding="utf-8") as file:
+                file.write(line + "\n")
+
+    def increment(self, name, amount=1, **labels):
+        """
+        Takes a counter's name, an amount and labels and adds the amount to the counter.
+
+        :param name: Counter's name, without the "infobot_" prefix.
+        :param amount: Amount added. (1 as default.)
+        :param labels: Labels telling apart the counter's series.
+
+        :return: None
+        """
+        with self._lock:
+            self._counters[(name, tuple(sorted(labels.items())))] += amount
+
+        self.log(name, value=amount, **labels)
+
+    def observe(self, name, value, **labels):
+        """
+        Takes a summary's name, an observed value and labels and records the value.
+
+        :param name: Summary's name, without the "infobot_" prefix.
+        :param value: Observed value, usually seconds.
+        :param labels: Labels telling apart the summary's series.
+
+        :return: None
+        """
+        with self._lock:
+            summary = self._summaries.setdefault((name, tuple(sorted(labels.items()))), [0, 0.0, 0.0])
+            summary[0] += 1
+            summary[1] += value
+            summary[2] = max(summary[2], value)
+
+        self.log(name, value=round(value, 6), **labels)
+
+    @contextlib.contextmanager
+    def timer(self, name, **labels):
+        """
+        Takes a summary's name and labels and observes the seconds spent in the with block.
+
+        :param name: Summary's name, without the "infobot_" prefix.
+        :param labels: Labels telling apart the summary's series.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def render(self):
+        """
+        Returns every counter and summary in Prometheus' text format.
+
+        :return: String with the metrics.
+        """
+        def series(name, labels, suffix=""):
+            label_text = ",".join(
+                f'{key}="' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"' for key, value in labels
+            )
+            return f"infobot_{name}{suffix}" + (f"{{{label_text}}}" if label_text else "")
+
+        lines = list()
+
+        with self._lock:
+            counters = sorted(self._counters.items())
+            summaries = sorted(self._summaries.items())
+
+        for name in sorted({name for (name, _), _ in counters}):
+            lines.append(f"# TYPE infobot_{name} counter")
+            lines.extend(f"{series(name, labels)} {total:g}" for (other, labels), total in counters if other == name)
+
+        for name in sorted({name for (name, _), _ in summaries}):
+            lines.append(f"# TYPE infobot_{name} summary")
+            for (other, labels), (count, total, maximum) in summaries:
+                if other == name:
+                    lines.append(f"{series(name, labels, '_count')} {count}")
+                    lines.append(f"{series(name, labels, '_sum')} {total:.6f}")
+                    lines.append(f"{series(name, labels, '_max')} {maximum:.6f}")
+
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port, host="127.0.0.1"):
+        """
+        Takes a port and serves the metrics at http://host:port/metrics from a background thread.
+
+        :param port: Desired port.
+        :param host: Desired interface. ("127.0.0.1" as default.)
+
+        :return: The running http.server.ThreadingHTTPServer.
+        """
+        import http.server  # Only imported when the metrics are served, it takes longer to load than the rest of the standard library used.
+
+        metrics = self
+
+        class MetricsHandler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = http.server.ThreadingHTTPServer((host, port), MetricsHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        return server
+
+
+METRICS = Metrics()
+
+
+# RETRIES
+
+
+class RetryPolicy:
+    """Capped exponential backoff with full jitter, bounded by a number of attempts and an overall deadline."""
+
+    def __init__(self, attempts=5, base_delay=1, max_delay=30, deadline=90, clock=time.monotonic, sleep=time.sleep):
+        """
+        Takes the limits of the retries.
+
+        :param attempts: Maximum amount of attempts, the first one included. (5 as default.)
+        :param base_delay: Seconds of the first backoff, doubled on each retry. (1 as default.)
+        :param max_delay: Longest backoff in seconds. (30 as default.)
+        :param deadline: Seconds after the first attempt in which a new attempt may still start. (90 as default.)
+        :param clock: Function returning monotonic seconds. (time.monotonic as default.)
+        :param sleep: Function that sleeps for the given seconds. (time.sleep as default.)
+        """
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.clock = clock
+        self.sleep = sleep
+
+    def delay(self, retry, error=None):
+        """
+        Takes the number of the retry (0 for the first) and the error that caused it, and returns the seconds to wait.
+
+        :param retry: Number of the retry.
+        :param error: Optional error. A Retry-After header in its response is respected, up to max_delay.
+
+        :return: Float with the seconds to wait.
+        """
+        retry_after = getattr(getattr(error, "response", None), "headers", dict()).get("Retry-After", "")
+        if retry_after.isdigit():
+            return min(float(retry_after), self.max_delay)
+
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** retry))
+
+
+def is_retryable(error):
+    """
+    Takes an error raised by a request and returns whether trying again may succeed.
+
+    Server errors (5xx), 429s, timeouts and connection errors are retryable. Other 4xx and parsing
+    errors are not, since the same request would fail the same way.
+
+    :param error: The exception raised.
+
+    :return: Bool.
+    """
+    if isinstance(error, requests.exceptions.HTTPError):
+        status_code = getattr(error.response, "status_code", None)
+        return status_code is None or status_code == 429 or status_code >= 500
+
+    return isinstance(error, (requests.exceptions.Timeout, requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError))
+
+
+class CircuitBreaker:
+    """
+    Stops calling a host that keeps failing.
+
+    After failure_threshold consecutive failures the circuit opens and every call fails at once.
+    Once reset_timeout seconds have passed a single trial call is let through, which closes the
+    circuit if it succeeds and opens it again otherwise.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=10 * 60, clock=time.monotonic):
+        """
+        Takes the failures that open the circuit and the seconds until it is tried again.
+
+        :param failure_threshold: Consecutive failures that open the circuit. (5 as default.)
+        :param reset_timeout: Seconds the circuit stays open. (600 as default.)
+        :param clock: Function returning monotonic seconds. (time.monotonic as default.)
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Returns whether a call may be made now."""
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if self._trial_running or self.clock() - self.opened_at < self.reset_timeout:
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self):
+        """Closes the circuit."""
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        """Counts a failure, opening the circuit if there were too many."""
+        with self._lock:
+            self.failures += 1
+            if self._trial_running or self.failures >= self.failure_threshold:
+                self.opened_at = self.clock()
+            self._trial_running = False
+
+
+RETRY_POLICY = RetryPolicy()
+SECRET_PARAMETERS = re.compile(r"\b(apiKey)=[\w.~%-]+")  # Query parameters hidden from the logs and the alerts.
+
+_circuit_breakers = dict()
+_circuit_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(url):
+    """
+    Takes an url and returns the CircuitBreaker of its host.
+
+    :param url: Desired web address.
+
+    :return: A CircuitBreaker shared by every request to the url's host.
+    """
+    host = urlsplit(url).netloc.lower()
+
+    with _circuit_breakers_lock:
+        if host not in _circuit_breakers:
+            _circuit_breakers[host] = CircuitBreaker()
+        return _circuit_breakers[host]
+
+
+def redact(text):
+    """
+    Takes a text, such as an error's message with the url requested, and returns it with the values of SECRET_PARAMETERS hidden.
+
+    :param text: Desired text.
+
+    :return: The text redacted.
+    """
+    return SECRET_PARAMETERS.sub(r"\1=[redacted]", text)
+
+
+def handle_http_error(func):
+    """
+    Decorator that retries a function taking an url as its first argument, according to RETRY_POLICY and the host's CircuitBreaker.
+
+    Only retryable errors are retried. When the attempts or the deadline run out, when the error is
+    not retryable or when the host's circuit is open, CouldNotConnectError is raised. Its message
+    is redacted, and it is not chained to the request's error, whose message has the whole url.
+    """
+
+    @functools.wraps(func)
+    def wrap(url, *args, **kwargs):
+        policy = RETRY_POLICY
+        circuit_breaker = get_circuit_breaker(url)
+        started = policy.clock()
+
+        host = urlsplit(url).netloc
+
+        for retry in range(policy.attempts):
+            if not circuit_breaker.allow():
+                METRICS.increment("circuit_open_total", host=host)
+                raise CouldNotConnectError(f"{host} is failing, not calling it for now.")
+
+            try:
+                result = func(url, *args, **kwargs)
+            except requests.exceptions.RequestException as error:
+                if not is_retryable(error):
+                    circuit_breaker.record_success()  # The host answered, the request itself is wrong.
+                    raise CouldNotConnectError(redact(f"Request to {url} failed: {error}")) from None
+
+                circuit_breaker.record_failure()
+                delay = policy.delay(retry, error)
+                if retry + 1 == policy.attempts or policy.clock() - started + delay > policy.deadline:
+                    raise CouldNotConnectError(redact(f"Request to {url} failed {retry + 1} times: {error}")) from None
+
+                print(redact(f"Request to {url} failed ({error}), retrying in {delay:.1f}s..."))
+                METRICS.increment("http_retries_total", host=host)
+                policy.sleep(delay)
+            except Exception:
+                circuit_breaker.record_success()  # The host answered, its content could not be used.
+                raise
+            else:
+                circuit_breaker.record_success()
+                return result
+
+    return wrap
+
+
+# CONCURRENCY
+
+
+MAX_WORKERS = 16  # Upper bound of threads used by a single gather call.
+MAX_CONNECTIONS_PER_HOST = 4  # Simultaneous requests allowed to the same host.
+
+_host_semaphores = dict()
+_host_semaphores_lock = threading.Lock()
+
+
+def get_host_semaphore(url):
+    """
+    Takes an url and returns the semaphore that limits the concurrent requests to its host.
+
+    :param url: Desired web address.
+
+    :return: A threading.BoundedSemaphore shared by every request to the url's host.
+    """
+    host = urlsplit(url).netloc.lower()
+
+    with _host_semaphores_lock:
+        if host not in _host_semaphores:
+            _host_semaphores[host] = threading.BoundedSemaphore(MAX_CONNECTIONS_PER_HOST)
+        return _host_semaphores[host]
+
+
+def gather(*functions):
+    """
+    Takes argumentless functions, runs them concurrently in a bounded thread pool and returns their results.
+
+    :param functions: Functions to be called. (Use functools.partial to bind arguments.)
+
+    :return: List with the results in the same order as the functions given. The first exception raised is reraised.
+    """
+    if len(functions) <= 1:
+        return [function() for function in functions]
+
+    with ThreadPoolExecutor(max_workers=min(len(functions), MAX_WORKERS)) as executor:
+        futures = [executor.submit(function) for function in functions]
+        return [future.result() for future in futures]
+
+
+# HTTP CLIENT
+
+
+HTTP_TIMEOUT = (5, 30)  # Seconds to wait to connect and to read, respectively.
+HTTP_HEADERS = {"User-Agent": "Mozilla/5.0"}  # Sent with every request unless overridden.
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def configure_http(timeout=None, headers=None):
+    """
+    Takes a timeout and default headers and applies them to every request made by the module.
+
+    :param timeout: Optional timeout in seconds, or a tuple with the connect and read timeouts. (Unchanged as default.)
+    :param headers: Optional dict of headers sent with every request. (Unchanged as default.)
+
+    :return: None
+    """
+    global HTTP_TIMEOUT
+
+    if timeout is not None:
+        HTTP_TIMEOUT = timeout
+
+    if headers is not None:
+        HTTP_HEADERS.clear()
+        HTTP_HEADERS.update(headers)
+        with _session_lock:
+            if _session is not None:
+                _session.headers.clear()
+                _session.headers.update(HTTP_HEADERS)
+
+
+def get_session():
+    """
+    Returns the process-wide requests.Session, creating it on first use.
+
+    The session keeps a pool of keep-alive connections per host, so consecutive requests to the
+    same website reuse the TCP and TLS connection.
+
+    :return: A shared requests.Session.
+    """
+    global _session
+
+    with _session_lock:
+        if _session is None:
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=MAX_WORKERS,
+                pool_maxsize=MAX_CONNECTIONS_PER_HOST,
+            )
+            session = requests.Session()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers.update(HTTP_HEADERS)
+            _session = session
+
+        return _session
+
+
+def http_get(url, headers=None, limit_host=True, **kwargs):
+    """
+    Takes an url and makes a GET request through the shared session, respecting the concurrency limit of its host.
+
+    The host's semaphore is only held until the headers arrive. A streamed body read afterwards must
+    be read holding it, with limit_host=False.
+
+    :param url: Desired web address.
+    :param headers: Optional headers, merged over the default ones.
+    :param limit_host: Whether the host's semaphore is taken. (True as default. False when the caller already holds it.)
+    :param kwargs: Optional keyword arguments passed to requests.Session.get.
+
+    :return: A requests.Response whose status was already checked.
+    """
+    kwargs.setdefault("timeout", HTTP_TIMEOUT)
+
+    with get_host_semaphore(url) if limit_host else contextlib.nullcontext():
+        with METRICS.timer("http_request_seconds", host=urlsplit(url).netloc):
+            response = get_session().get(url, headers=headers, **kwargs)
+    response.raise_for_status()
+
+    return response
+
+
+# STREAMING EXTRACTION
+
+
+STREAM_CHUNK_SIZE = 16 * 1024  # Bytes read at a time.
+STREAM_WINDOW_OVERLAP = 4 * 1024  # Characters of the previous chunk searched again with the next one.
+
+
+def search_fields(text, patterns, values):
+    """
+    Takes a text, compiled patterns with named groups and the values already found, and adds the missing ones found in the text.
+
+    :param text: String to be searched.
+    :param patterns: List of compiled patterns. Each named group is a field.
+    :param values: Dict of field -> value, updated in place.
+
+    :return: Float with the seconds spent searching.
+    """
+    started = time.perf_counter()
+
+    for pattern in patterns:
+        missing = [field for field in pattern.groupindex if field not in values]
+        if not missing:
+            continue
+
+        for match in pattern.finditer(text):
+            for field in missing:
+                if match.group(field) is not None and field not in values:
+                    values[field] = match.group(field)
+            if all(field in values for field in missing):
+                break
+
+    elapsed = time.perf_counter() - started
+    METRICS.observe("parse_seconds", elapsed, kind="quotes")
+
+    return elapsed
+
+
+@handle_http_error
+def fetch_values(url, patterns, headers=None, budget=None):
+    """
+    Takes an url and compiled patterns with named groups and returns the first value of each group, reading the page only until all of them were found.
+
+    The body is read in chunks and each chunk is searched together with the end of the previous
+    one. The connection is closed as soon as every field matched. A match that spans more than the
+    overlap is only found by the search over the whole page done when the body ends.
+
+    :param url: Desired web address.
+    :param patterns: List of compiled patterns. Each named group is a field.
+    :param headers: Optional headers, merged over the default ones.
+    :param budget: Optional seconds the searches may take in total before the page is given up as unparseable. (None as default.)
+
+    :return: Dict with the fields and their values.
+    """
+    fields = {field for pattern in patterns for field in pattern.groupindex}
+    values = dict()
+    spent = 0.0
+
+    def search(text):
+        nonlocal spent
+        spent += search_fields(text, patterns, values)
+        if budget is not None and spent > budget:
+            METRICS.increment("parse_budget_exceeded_total", host=urlsplit(url).netloc)
+            raise CouldNotParseError(f"Searching {url} took over {budget}s.")
+
+    with get_host_semaphore(url):  # Held until the body is read, so the streams count against the host's limit.
+        response = http_get(url, headers=headers, limit_host=False, stream=True)
+
+        try:
+            decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(errors="replace")
+            chunks = list()
+            tail = ""
+
+            for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+                text = decoder.decode(chunk)
+                chunks.append(text)
+
+                window = tail + text
+                search(window)
+                if len(values) == len(fields):
+                    return values
+                tail = window[-STREAM_WINDOW_OVERLAP:]
+
+            chunks.append(decoder.decode(b"", final=True))
+            search("".join(chunks))
+        finally:
+            response.close()
+
+    if len(values) < len(fields):
+        raise CouldNotParseError(f"{', '.join(sorted(fields - set(values)))} not found at {url}.")
+
+    return values
+
+
+# RESPONSE CACHE
+
+
+RESPONSE_CACHE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "response_cache")
+
+
+class ResponseCache:
+    """Keeps the last body of each page with its validators (ETag and Last-Modified), one json file per url."""
+
+    def __init__(self, directory):
+        """
+        Takes the directory where the pages are stored, creating it if needed.
+
+        :param directory: Desired directory path.
+        """
+        self.directory = directory
+        self._entries = dict()  # url -> entry, so each file is read at most once.
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, url):
+        """Takes an url and returns the path of its file."""
+        return os.path.join(self.directory, hashlib.sha1(url.encode("utf-8")).hexdigest() + ".json")
+
+    def get(self, url):
+        """
+        Takes an url and returns its cached entry, or None if it was never stored.
+
+        :param url: Desired web address.
+
+        :return: Dict with the url, body, etag, last_modified and fetched_at (seconds since the epoch), or None.
+        """
+        with self._lock:
+            if url not in self._entries:
+                try:
+                    with open(self._path(url), encoding="utf-8") as file:
+                        self._entries[url] = json.load(file)
+                except (OSError, ValueError):
+                    return None
+            return self._entries[url]
+
+    def put(self, url, body, etag=None, last_modified=None):
+        """
+        Takes an url, its body and its validators and stores them.
+
+        :param url: Desired web address.
+        :param body: String with the page's text.
+        :param etag: The ETag header received, if any.
+        :param last_modified: The Last-Modified header received, if any.
+
+        :return: The entry stored.
+        """
+        entry = {"url": url, "body": body, "etag": etag, "last_modified": last_modified, "fetched_at": time.time()}
+        self._write(url, entry)
+        return entry
+
+    def touch(self, url, entry):
+        """Takes an url and its entry and marks it as just validated by the server."""
+        entry = dict(entry, fetched_at=time.time())
+        self._write(url, entry)
+        return entry
+
+    def _write(self, url, entry):
+        """Saves an entry in memory and on disk, replacing the previous file atomically."""
+        path = self._path(url)
+        temporary_path = f"{path}.{threading.get_ident()}.tmp"
+
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            json.dump(entry, file)
+        os.replace(temporary_path, path)
+
+        with self._lock:
+            self._entries[url] = entry
+
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """
+    Returns the process-wide ResponseCache, stored at RESPONSE_CACHE_DIRECTORY.
+
+    :return: A shared ResponseCache.
+    """
+    global _response_cache
+
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache(RESPONSE_CACHE_DIRECTORY)
+
+        return _response_cache
+
+
+@handle_http_error
+def fetch_page(url, headers=None, ttl=None):
+    """
+    Takes an url and returns the page's text, optionally through the response cache.
+
+    With a ttl, a page fetched less than ttl seconds ago is served from the cache without any
+    request, and an older one is requested conditionally, so an unchanged page costs a 304 with
+    no body.
+
+    :param url: Desired web address.
+    :param headers: Optional headers, merged over the default ones.
+    :param ttl: Seconds a cached page is served without being validated. (None as default, which disables the cache.)
+
+    :return: String with the page's text.
+    """
+    if ttl is None:
+        return http_get(url, headers=headers).text
+
+    cache = get_response_cache()
+    entry = cache.get(url)
+
+    if entry is None:
+        conditional_headers = dict()
+    elif time.time() - entry["fetched_at"] < ttl:
+        METRICS.increment("response_cache_total", result="fresh")
+        return entry["body"]
+    else:
+        conditional_headers = dict()
+        if entry["etag"]:
+            conditional_headers["If-None-Match"] = entry["etag"]
+        if entry["last_modified"]:
+            conditional_headers["If-Modified-Since"] = entry["last_modified"]
+
+    response = http_get(url, headers=dict(headers or dict(), **conditional_headers))
+
+    if response.status_code == 304 and entry is not None:
+        METRICS.increment("response_cache_total", result="not_modified")
+        return cache.touch(url, entry)["body"]
+
+    METRICS.increment("response_cache_total", result="miss")
+    return cache.put(
+        url, response.text, response.headers.get("ETag"), response.headers.get("Last-Modified")
+    )["body"]
+
+
+def shorten_url(url):
+    """
+    Takes an url and returns it shortened.
+
+    The request is retried against tinyurl's own circuit breaker, not the one of the url's host.
+
+    :param url: Desired web address.
+
+    :return: Desired web address shortened. (http://tinyurl.com/XXXXXXXX)
+    """
+    request_url = "http://tinyurl.com/api-create.php?" + urlencode({"url": url})
+
+    return fetch_page(request_url).strip()
+
+
+# SHORT URL CACHE
+
+
+SHORT_URL_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "short_urls.json")
+SHORT_URL_CACHE_SIZE = 2000  # Maximum amount of urls kept.
+SHORT_URL_CACHE_TTL = 30 * 24 * 60 * 60  # Seconds an url is kept after being shortened.
+
+
+class ShortUrlCache:
+    """Size bounded, least recently used cache of shortened urls, persisted to a json file."""
+
+    def __init__(self, path, max_size=SHORT_URL_CACHE_SIZE, ttl=SHORT_URL_CACHE_TTL):
+        """
+        Takes the cache file path, the maximum size and the time to live and loads the cache from disk.
+
+        :param path: Path of the json file the cache is persisted to.
+        :param max_size: Maximum amount of urls kept. (SHORT_URL_CACHE_SIZE as default.)
+        :param ttl: Seconds an url is kept after being shortened. (SHORT_URL_CACHE_TTL as default.)
+        """
+        self.path = path
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = collections.OrderedDict()  # url -> (short url, time it was shortened)
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        """Loads the entries saved on disk, ignoring a missing or corrupted file."""
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                entries = json.load(file)
+        except (OSError, ValueError):
+            return
+
+        with self._lock:
+            for url, short_url, created_at in entries:
+                self._entries[url] = (short_url, created_at)
+            self._evict()
+
+    def save(self):
+        """Saves the entries to disk, replacing the previous file atomically."""
+        temporary_path = self.path + ".tmp"
+
+        with self._lock:
+            entries = [[url, short_url, created_at] for url, (short_url, created_at) in self._entries.items()]
+            with open(temporary_path, "w", encoding="utf-8") as file:
+                json.dump(entries, file)
+            os.replace(temporary_path, self.path)
+
+    def get(self, url):
+        """
+        Takes an url and returns its cached short url, or None if it is missing or expired.
+
+        :param url: Desired web address.
+
+        :return: String with the short url or None.
+        """
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None:
+                return None
+            if time.time() - entry[1] > self.ttl:
+                del self._entries[url]
+                return None
+            self._entries.move_to_end(url)
+            return entry[0]
+
+    def put(self, url, short_url):
+        """
+        Takes an url and its short url and caches them, evicting the least recently used entries if needed.
+
+        :param url: Desired web address.
+        :param short_url: The web address shortened.
+
+        :return: None
+        """
+        with self._lock:
+            self._entries[url] = (short_url, time.time())
+            self._entries.move_to_end(url)
+            self._evict()
+
+    def _evict(self):
+        """Drops expired entries and then the least recently used ones beyond the maximum size."""
+        now = time.time()
+        for url in [url for url, (_, created_at) in self._entries.items() if now - created_at > self.ttl]:
+            del self._entries[url]
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+
+_short_url_cache = None
+_short_url_cache_lock = threading.Lock()
+
+
+def get_short_url_cache():
+    """
+    Returns the process-wide ShortUrlCache, loading it from SHORT_URL_CACHE_FILE on first use.
+
+    :return: A shared ShortUrlCache.
+    """
+    global _short_url_cache
+
+    with _short_url_cache_lock:
+        if _short_url_cache is None:
+            _short_url_cache = ShortUrlCache(SHORT_URL_CACHE_FILE)
+
+        return _short_url_cache
+
+
+def shorten_urls(urls):
+    """
+    Takes a list of urls and returns them shortened, only requesting the ones that are not cached, concurrently.
+
+    An url that could not be shortened is returned whole. Twitter counts every link as
+    TWEET_URL_WEIGHT characters, so the tweet still fits, and it is requested again next time.
+
+    :param urls: List of desired web addresses.
+
+    :return: List with the web addresses shortened, or whole, in the same order.
+    """
+    cache = get_short_url_cache()
+
+    def shorten(url):
+        try:
+            return shorten_url(url)
+        except CouldNotConnectError as error:
+            print(f"Could not shorten {url}, using it whole: {error!r}")
+            METRICS.increment("short_url_failures_total")
+            return None
+
+    short_urls = {url: cache.get(url) for url in urls}
+    misses = [url for url, short_url in short_urls.items() if short_url is None]
+
+    METRICS.increment("short_url_cache_total", len(short_urls) - len(misses), result="hit")
+    METRICS.increment("short_url_cache_total", len(misses), result="miss")
+
+    if misses:
+        with METRICS.timer("shorten_seconds"):
+            new_short_urls = gather(*[functools.partial(shorten, url) for url in misses])
+        for url, short_url in zip(misses, new_short_urls):
+            if short_url is None:
+                short_urls[url] = url
+            else:
+                cache.put(url, short_url)
+                short_urls[url] = short_url
+        cache.save()
+
+    return [short_urls[url] for url in urls]
+
+
+def send_me_an_text_message(twilio_client, TWILIO_NUMBER, MOBILE_NUMBER, text):
+    """
+    Sends a text message through twilio.
+
+    :param twilio_client: A Twilio Client, as created by ClientManager.
+    :param TWILIO_NUMBER: Twilio number.
+    :param MOBILE_NUMBER: Your mobile number.
+    :param text: Text message to send.
+
+    :return: None
+    """
+    twilio_client.messages.create(body=text, from_=TWILIO_NUMBER, to=MOBILE_NUMBER)
+
+
+# ALERTS
+
+
+ALERT_QUEUE_SIZE = 100  # Alerts waiting to be sent by each sink. Newer ones are dropped when it is full.
+ALERT_DEDUP_WINDOW = 30 * 60  # Seconds an alert is not sent again after being sent. The repetitions are counted in the next one.
+ALERT_FLUSH_TIMEOUT = 60  # Seconds the last alerts have to be sent before the process stops.
+ALERT_SEND_TIMEOUT = 20  # Seconds a sink's request has to be answered.
+
+
+class AlertSink:
+    """Destination of the alerts, such as a text message. Subclasses implement send."""
+
+    name = "alert sink"
+
+    def send(self, text):
+        """
+        Takes the alert's text and delivers it, raising if it could not.
+
+        :param text: Desired text.
+
+        :return: None
+        """
+        raise NotImplementedError
+
+
+class TwilioSink(AlertSink):
+    """Sends the alerts as text messages through Twilio, reusing the ClientManager's client."""
+
+    name = "twilio"
+
+    def __init__(self, clients, TWILIO_NUMBER, MOBILE_NUMBER):
+        """
+        Takes the ClientManager with Twilio's credentials and the numbers.
+
+        :param clients: A ClientManager.
+        :param TWILIO_NUMBER: Twilio number.
+        :param MOBILE_NUMBER: Your mobile number.
+        """
+        self.clients = clients
+        self.TWILIO_NUMBER = TWILIO_NUMBER
+        self.MOBILE_NUMBER = MOBILE_NUMBER
+
+    def send(self, text):
+        send_me_an_text_message(self.clients.twilio, self.TWILIO_NUMBER, self.MOBILE_NUMBER, text)
+
+
+class FileSink(AlertSink):
+    """Appends the alerts to a local file, one line each."""
+
+    name = "file"
+
+    def __init__(self, path):
+        """
+        Takes the file path.
+
+        :param path: Path of the file, appended to.
+        """
+        self.path = path
+
+    def send(self, text):
+        with open(self.path, "a", encoding="utf-8") as file:
+            file.write(f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S} {' '.join(text.split())}\n")
+
+
+class WebhookSink(AlertSink):
+    """Posts the alerts as json, {"text": ...}, to an url, such as a chat's incoming webhook."""
+
+    name = "webhook"
+
+    def __init__(self, url):
+        """
+        Takes the webhook's url.
+
+        :param url: Desired web address.
+        """
+        self.url = url
+
+    def send(self, text):
+        get_session().post(self.url, json=dict(text=text), timeout=ALERT_SEND_TIMEOUT).raise_for_status()
+
+
+class Alert:
+    """An alert waiting to be sent, with how many times it was raised."""
+
+    def __init__(self, key, text, level):
+        """
+        Takes the alert's key, text and level.
+
+        :param key: Identity of the alert. Alerts with the same key are coalesced and deduplicated.
+        :param text: Desired text. A repetition replaces it with its own.
+        :param level: "error" or "warning".
+        """
+        self.key = key
+        self.text = text
+        self.level = level
+        self.count = 1
+
+
+class AlertDispatcher:
+    """
+    Sends alerts to the sinks from background threads, so raising an alert never blocks the caller.
+
+    Each sink has a bounded queue and a thread of its own. An alert raised again while still queued
+    is coalesced into the queued one, and an alert sent recently is suppressed and counted in its
+    next delivery. A sink is retried with backoff in its own thread, so a failing sink neither
+    busy-loops nor holds up the others.
+    """
+
+    def __init__(self, sinks=None, queue_size=ALERT_QUEUE_SIZE, dedup_window=ALERT_DEDUP_WINDOW, retry_policy=None):
+        """
+        Takes the sinks, the queues' size, the deduplication window and the retry policy of the sinks.
+
+        :param sinks: Optional list of AlertSink. (None as default, which ignores the alerts until a sink is added.)
+        :param queue_size: Alerts waiting to be sent by each sink. (ALERT_QUEUE_SIZE as default.)
+        :param dedup_window: Seconds an alert is not sent again. (ALERT_DEDUP_WINDOW as default.)
+        :param retry_policy: RetryPolicy of each delivery. (5 attempts within 30 minutes, backing off up to 5 minutes, as default.)
+        """
+        self.sinks = list() if sinks is None else sinks
+        self.queue_size = queue_size
+        self.dedup_window = dedup_window
+        self.retry_policy = RetryPolicy(base_delay=5, max_delay=5 * 60, deadline=30 * 60) if retry_policy is None else retry_policy
+        self._queues = dict()  # Sink -> queue.Queue of the Alerts it has to send
+        self._queued = dict()  # key -> Alert still in the queues
+        self._last_sent = dict()  # key -> seconds since the epoch it was last sent
+        self._suppressed = collections.Counter()  # key -> repetitions since it was last sent
+        self._lock = threading.Lock()
+
+    def alert(self, key, text, level="error"):
+        """
+        Takes an alert and queues it to be sent by every sink, returning immediately.
+
+        :param key: Identity of the alert, such as "source/currencies".
+        :param text: Desired text.
+        :param level: "error" or "warning". ("error" as default.)
+
+        :return: None
+        """
+        if not self.sinks:
+            return
+
+        with self._lock:
+            if key in self._queued:
+                self._queued[key].count += 1
+                self._queued[key].text = text
+                METRICS.increment("alerts_total", level=level, result="coalesced")
+                return
+
+            if time.time() - self._last_sent.get(key, -math.inf) < self.dedup_window:
+                self._suppressed[key] += 1
+                METRICS.increment("alerts_total", level=level, result="suppressed")
+                return
+
+            pending = Alert(key, text, level)
+            pending.count += self._suppressed.pop(key, 0)
+            queued = False
+
+            for sink in self.sinks:
+                try:
+                    self._get_queue(sink).put_nowait(pending)
+                    queued = True
+                except queue.Full:
+                    METRICS.increment("alert_deliveries_total", sink=sink.name, result="dropped")
+
+            if not queued:
+                METRICS.increment("alerts_total", level=level, result="dropped")
+                return
+            self._queued[key] = pending
+            METRICS.increment("alerts_total", level=level, result="queued")
+
+    def _get_queue(self, sink):
+        """Takes a sink and returns its queue, starting its thread on first use. Called with the lock held."""
+        if sink not in self._queues:
+            self._queues[sink] = queue.Queue(maxsize=self.queue_size)
+            threading.Thread(target=self._work, args=(sink,), name=f"infobot alerts ({sink.name})", daemon=True).start()
+
+        return self._queues[sink]
+
+    def _work(self, sink):
+        """Takes a sink and sends the alerts queued for it, forever."""
+        alerts = self._queues[sink]
+
+        while True:
+            pending = alerts.get()
+
+            with self._lock:
+                if self._queued.get(pending.key) is pending:  # The first sink to take it closes it to repetitions.
+                    del self._queued[pending.key]
+                    self._last_sent[pending.key] = time.time()
+                text = pending.text if pending.count == 1 else f"{pending.text}\n\n({pending.count} times)"
+
+            try:
+                self._deliver(sink, f"[{pending.level}] {text}")
+            finally:
+                alerts.task_done()
+
+    def _deliver(self, sink, text):
+        """Takes a sink and a text and sends it, retrying with backoff until the retry policy gives up."""
+        policy = self.retry_policy
+        started = policy.clock()
+
+        for retry in range(policy.attempts):
+            try:
+                sink.send(text)
+            except Exception as error:
+                delay = policy.delay(retry, error)
+                if retry + 1 == policy.attempts or policy.clock() - started + delay > policy.deadline:
+                    print(f"Could not send an alert through {sink.name}: {error!r}")
+                    METRICS.increment("alert_deliveries_total", sink=sink.name, result="failed")
+                    return
+                policy.sleep(delay)
+            else:
+                METRICS.increment("alert_deliveries_total", sink=sink.name, result="sent")
+                return
+
+    def flush(self, timeout=ALERT_FLUSH_TIMEOUT):
+        """
+        Waits until every sink handled its queued alerts or the timeout passes.
+
+        :param timeout: Seconds to wait at most. (ALERT_FLUSH_TIMEOUT as default.)
+
+        :return: Bool with whether every queue was emptied.
+        """
+        deadline = time.monotonic() + timeout
+
+        with self._lock:
+            alerts = list(self._queues.values())
+
+        while time.monotonic() < deadline:
+            if all(sink_queue.unfinished_tasks == 0 for sink_queue in alerts):
+                return True
+            time.sleep(0.05)
+
+        return all(sink_queue.unfinished_tasks == 0 for sink_queue in alerts)
+
+
+ALERTS = AlertDispatcher()
+
+
+# TWEET LAYOUT
+
+
+TWEET_MAX_WEIGHT = 280  # Twitter's limit, in weighted characters.
+TWEET_URL_WEIGHT = 23  # Every link counts as a t.co link of this length, whatever its own.
+# Code point ranges counted as one character. Every other code point, such as CJK and emoji, counts as two.
+TWEET_LIGHT_RANGES = [(0x0000, 0x10FF), (0x2000, 0x200D), (0x2010, 0x201F), (0x2032, 0x2037)]
+TWEET_URL_PATTERN = re.compile(r"https?://\S+")
+REPLY_PREFIX_MAX_WEIGHT = 17  # "@", the longest username allowed (15) and the line break before the message.
+NEWS_TITLE_MAX_WEIGHT = TWEET_MAX_WEIGHT - REPLY_PREFIX_MAX_WEIGHT - TWEET_URL_WEIGHT - 2  # Room left beside the link and its line breaks.
+
+
+def get_character_weight(character):
+    """
+    Takes a character and returns how many characters it counts as in a tweet.
+
+    :param character: String with one character.
+
+    :return: Int, 1 or 2.
+    """
+    code_point = ord(character)
+
+    return 1 if any(start <= code_point <= end for start, end in TWEET_LIGHT_RANGES) else 2
+
+
+def get_tweet_weight(text):
+    """
+    Takes a text and returns its length the way Twitter counts it, with every link as long as a t.co link.
+
+    Emoji sequences are counted by code point, which is never less than what Twitter counts.
+
+    :param text: Desired text.
+
+    :return: Int with the weighted length.
+    """
+    weight = 0
+    position = 0
+
+    for match in TWEET_URL_PATTERN.finditer(text):
+        weight += sum(get_character_weight(character) for character in text[position:match.start()]) + TWEET_URL_WEIGHT
+        position = match.end()
+
+    return weight + sum(get_character_weight(character) for character in text[position:])
+
+
+def truncate_tweet_text(text, max_weight):
+    """
+    Takes a text without links and cuts it, with "...", so its weighted length is at most the given one.
+
+    :param text: Desired text.
+    :param max_weight: Weighted length allowed.
+
+    :return: The text, cut if needed.
+    """
+    if get_tweet_weight(text) <= max_weight:
+        return text
+
+    weight = 0
+    for index, character in enumerate(text):
+        weight += get_character_weight(character)
+        if weight > max_weight - 3:
+            return text[:index] + "..."
+
+    return text
+
+
+def pack_texts(texts, prefix="", separator="\n\n", max_weight=TWEET_MAX_WEIGHT):
+    """
+    Takes texts and joins as many consecutive ones as fit in each tweet, keeping their order.
+
+    :param texts: List of strings. One that does not fit alone is left in a tweet of its own.
+    :param prefix: Text added to every tweet, such as a reply's "@username\n". ("" as default.)
+    :param separator: Text between the texts joined. ("\n\n" as default.)
+    :param max_weight: Weighted length allowed for each tweet. (TWEET_MAX_WEIGHT as default.)
+
+    :return: List of strings, one per tweet, without the prefix.
+    """
+    tweets = list()
+
+    for text in texts:
+        if tweets and get_tweet_weight(prefix + tweets[-1] + separator + text) <= max_weight:
+            tweets[-1] += separator + text
+        else:
+            tweets.append(text)
+
+    METRICS.increment("tweets_saved_by_packing_total", len(texts) - len(tweets))
+
+    return tweets
+
+
+# TWITTER
+
+
+def authenticate(API_KEY, API_SECRET_KEY, ACCESS_TOKEN, ACCESS_TOKEN_SECRET):
+    """
+    Takes Twitter's Api Key, Api Secret Key, Access Token, and Access Token Secret, returns an authenticated Twitter Api Object.
+
+    :param API_KEY: Twitter's Api key.
+    :param API_SECRET_KEY: Twitter's Api secret key.
+    :param ACCESS_TOKEN: Twitter's Api access token.
+    :param ACCESS_TOKEN_SECRET: Twitter's Api access token secret.
+
+    :return: An authenticated Tweepy Api Object.
+    """
+    authentication = tweepy.OAuthHandler(API_KEY, API_SECRET_KEY)
+    authentication.set_access_token(ACCESS_TOKEN, ACCESS_TOKEN_SECRET)
+
+    return tweepy.API(authentication)
+
+
+class DryRunApi:
+    """Stands for the Tweepy Api Object in dry runs: prints the statuses instead of posting them, without loading Tweepy."""
+
+    rate_limit_errors = ()  # It is never rate limited, so ThreadBuilder does not need Tweepy's RateLimitError.
+
+    def __init__(self, username):
+        """
+        Takes the account's username, used in the printed statuses.
+
+        :param username: Twitter account username without @.
+        """
+        self.username = username
+        self.last_response = None
+        self._last_id = 0
+        self._lock = threading.Lock()
+
+    def verify_credentials(self, **kwargs):
+        """Accepts any credentials."""
+        return True
+
+    def update_status(self, status, in_reply_to_status_id=None, **kwargs):
+        """
+        Takes a status and the id of the status it answers, prints them and returns a status with a made up id.
+
+        :return: An object with the id of the status.
+        """
+        with self._lock:
+            self._last_id += 1
+            status_id = self._last_id
+
+        print(f"[dry run @{self.username}] #{status_id} in reply to {in_reply_to_status_id}:\n{status}\n")
+
+        return types.SimpleNamespace(id=status_id)
+
+
+class ClientManager:
+    """Creates the Twitter and Twilio clients once and hands out the same objects on every cycle."""
+
+    def __init__(self, API_KEY, API_SECRET_KEY, ACCESS_TOKEN, ACCESS_TOKEN_SECRET, TWILIO_ACCOUNT_SID="", TWILIO_AUTH_TOKEN="", dry_run_username=None):
+        """
+        Takes Twitter's and Twilio's credentials. No client is created until it is first used.
+
+        :param API_KEY: Twitter's Api key.
+        :param API_SECRET_KEY: Twitter's Api secret key.
+        :param ACCESS_TOKEN: Twitter's Api access token.
+        :param ACCESS_TOKEN_SECRET: Twitter's Api access token secret.
+        :param TWILIO_ACCOUNT_SID: Twilio Account SID. ("" as default.)
+        :param TWILIO_AUTH_TOKEN: Twilio Auth Token. ("" as default.)
+        :param dry_run_username: Username of a dry run, whose Twitter client is a DryRunApi. (None as default, which posts for real.)
+        """
+        self._twitter_credentials = (API_KEY, API_SECRET_KEY, ACCESS_TOKEN, ACCESS_TOKEN_SECRET)
+        self._twilio_credentials = (TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+        self._dry_run_username = dry_run_username
+        self._twitter = None
+        self._twilio = None
+        self._lock = threading.Lock()
+
+    @property
+    def twitter(self):
+        """The authenticated Tweepy Api Object, or a DryRunApi in dry runs, created on first use."""
+        with self._lock:
+            if self._twitter is None:
+                if self._dry_run_username is not None:
+                    self._twitter = DryRunApi(self._dry_run_username)
+                else:
+                    self._twitter = authenticate(*self._twitter_credentials)
+            return self._twitter
+
+    @property
+    def twilio(self):
+        """The Twilio Client, created on first use."""
+        with self._lock:
+            if self._twilio is None:
+                self._twilio = twilio_rest.Client(
+                    *self._twilio_credentials, http_client=twilio_http_client.TwilioHttpClient(timeout=ALERT_SEND_TIMEOUT)
+                )
+            return self._twilio
+
+    def verify(self, twilio=False):
+        """
+        Checks the credentials with one cheap call to each service, so bad credentials fail at startup.
+
+        :param twilio: Whether Twilio's credentials should be checked too. (False as default.)
+
+        :return: None
+        """
+        if not self.twitter.verify_credentials(skip_status=True, include_entities=False):
+            raise Exception("Twitter's credentials were rejected.")
+
+        if twilio:
+            self.twilio.api.v2010.accounts(self._twilio_credentials[0]).fetch()
+
+
+def tweet(api, message):
+    """
+    Takes an authenticated Tweepy Api Object, a message and tweets it.
+
+    :param api: An authenticated Tweepy Api Object.
+    :param message: Desired message to tweet.
+
+    :return: The Tweepy Status created.
+    """
+    return api.update_status(status=message)
+
+
+def reply(api, message, username, status_id):
+    """
+    Takes an authenticated Tweepy Api Object, a message, an username and a status id and replies it with the message.
+
+    :param api: An authenticated Tweepy Api Object.
+    :param message: Desired message to reply.
+    :param username: Twitter account username without @.
+    :param status_id: The id of the tweet to be replied.
+
+    :return: The Tweepy Status created.
+    """
+    return api.update_status(
+        status="@" + username + "\n" + message,
+        in_reply_to_status_id=status_id,  # The @username must be used for the message to be recognized as a reply.
+    )
+
+
+# Twitter's limit for statuses/update, shared by tweets and replies.
+TWEET_RATE_LIMIT = 300  # Tweets per window.
+TWEET_RATE_WINDOW = 3 * 60 * 60  # Seconds.
+TWEET_RATE_RESERVE = 10  # Tweets left untouched for manual use, from which on the posting slows down.
+
+
+class PostingScheduler:
+    """
+    Token bucket that paces tweets according to Twitter's rate limit.
+
+    The bucket starts full and refills continuously. Whenever the api reports its rate limit state
+    in the response headers, the bucket is synchronized with it instead. Tweets go out immediately
+    while the bucket is above the reserve and only wait when it gets close to the limit.
+    """
+
+    def __init__(self, limit=TWEET_RATE_LIMIT, window=TWEET_RATE_WINDOW, reserve=TWEET_RATE_RESERVE, clock=time.monotonic, sleep=time.sleep):
+        """
+        Takes the rate limit, its window and the reserve, and creates a full bucket.
+
+        :param limit: Tweets allowed per window. (TWEET_RATE_LIMIT as default.)
+        :param window: Seconds of the rate limit window. (TWEET_RATE_WINDOW as default.)
+        :param reserve: Tokens kept unused. (TWEET_RATE_RESERVE as default.)
+        :param clock: Function returning monotonic seconds. (time.monotonic as default.)
+        :param sleep: Function that sleeps for the given seconds. (time.sleep as default.)
+        """
+        self.limit = limit
+        self.rate = limit / window
+        self.reserve = reserve
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = float(limit)
+        self.updated = clock()
+        self.reset_at = None  # Monotonic time the api said the window resets, when known.
+        self.throttled = 0.0  # Total seconds spent waiting for the rate limit.
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        """Adds the tokens earned since the last update, or fills the bucket if the api's window was reset."""
+        now = self.clock()
+
+        if self.reset_at is not None:
+            if now >= self.reset_at:
+                self.tokens = float(self.limit)
+                self.reset_at = None
+        else:
+            self.tokens = min(self.limit, self.tokens + (now - self.updated) * self.rate)
+
+        self.updated = now
+
+    def acquire(self):
+        """
+        Blocks until a tweet can be posted and consumes a token.
+
+        :return: Float with the seconds waited.
+        """
+        waited = 0.0
+
+        with self._lock:
+            while True:
+                self._refill()
+
+                if self.tokens >= self.reserve + 1:
+                    self.tokens -= 1
+                    break
+
+                if self.reset_at is not None:
+                    delay = self.reset_at - self.clock()
+                else:
+                    delay = (self.reserve + 1 - self.tokens) / self.rate
+
+                delay = max(delay, 0.01)
+                self.sleep(delay)
+                waited += delay
+
+            self.throttled += waited
+
+        return waited
+
+    def update(self, response):
+        """
+        Takes the last http response of the api and synchronizes the bucket with its rate limit headers, if any.
+
+        :param response: A requests.Response, or None.
+
+        :return: None
+        """
+        headers = getattr(response, "headers", None) or dict()
+
+        try:
+            remaining = int(headers["x-rate-limit-remaining"])
+            reset = float(headers["x-rate-limit-reset"])
+        except (KeyError, ValueError):
+            return
+
+        with self._lock:
+            if "x-rate-limit-limit" in headers:
+                self.limit = int(headers["x-rate-limit-limit"])
+            self.tokens = float(remaining)
+            self.reset_at = self.clock() + max(reset - time.time(), 0)
+            self.updated = self.clock()
+
+    def exhaust(self, response):
+        """
+        Takes the response of a rate limited request and empties the bucket until the window resets.
+
+        :param response: A requests.Response, or None.
+
+        :return: None
+        """
+        self.update(response)
+
+        with self._lock:
+            self.tokens = 0.0
+            if self.reset_at is None:
+                self.reset_at = self.clock() + (self.reserve + 1) / self.rate
+
+
+class ThreadJournal:
+    """
+    The thread being posted, kept on disk so a restarted process finishes it instead of starting over.
+
+    It holds the thread's scheduled instant, its data and the id of every status posted so far, each
+    one saved as soon as the status is created. A status posted right before a crash, but not saved
+    yet, is the only one that can be posted twice.
+    """
+
+    def __init__(self, path):
+        """
+        Takes the file path and loads the unfinished thread saved on it, ignoring a missing or corrupted file.
+
+        :param path: Path of the json file.
+        """
+        self.path = path
+        self._entry = None  # {"instant": iso string, "data": list, "posted": {key: status id}}
+        self._lock = threading.Lock()
+
+        try:
+            with open(path, encoding="utf-8") as file:
+                self._entry = json.load(file)
+        except (OSError, ValueError):
+            pass
+
+    def _save(self):
+        """Saves the entry to disk, replacing the previous file atomically and durably."""
+        temporary_path = self.path + ".tmp"
+
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            json.dump(self._entry, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary_path, self.path)
+
+    def unfinished(self):
+        """
+        Returns the thread left unfinished, if any.
+
+        :return: Tuple with the scheduled instant, an aware datetime, and the data, as returned by get_data, or None.
+        """
+        with self._lock:
+            if self._entry is None:
+                return None
+
+            currencies_text, stock_indexes_text, news_list, daily_header = self._entry["data"]
+            data = (currencies_text, stock_indexes_text, [tuple(news) for news in news_list], daily_header)
+
+            return datetime.datetime.fromisoformat(self._entry["instant"]), data
+
+    def begin(self, instant, data):
+        """
+        Takes a scheduled instant and its data and saves them as the thread being posted.
+
+        :param instant: The scheduled instant, an aware datetime.
+        :param data: Tuple returned by get_data.
+
+        :return: None
+        """
+        with self._lock:
+            self._entry = dict(instant=instant.isoformat(), data=list(data), posted=dict())
+            self._save()
+
+    def get(self, key):
+        """Takes a post's key and returns the id of its status if it was already posted, or None."""
+        with self._lock:
+            return None if self._entry is None else self._entry["posted"].get(key)
+
+    def record(self, key, status_id):
+        """Takes a post's key and the id of its status and saves them."""
+        with self._lock:
+            if self._entry is not None:
+                self._entry["posted"][key] = status_id
+                self._save()
+
+    def finish(self):
+        """Forgets the thread, once it was completely posted."""
+        with self._lock:
+            self._entry = None
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+
+MAX_PARALLEL_BRANCHES = 4  # Branches of a thread posted at the same time.
+
+
+class Post:
+    """A status of a thread and its replies, which are posted one after the other unless the post is parallel."""
+
+    def __init__(self, message, key, children=None, parallel=False):
+        """
+        Takes the message, its key in the thread, its replies and whether they are posted concurrently.
+
+        :param message: Desired message.
+        :param key: Key of the post in the thread, such as "news/0/3", used by the journal.
+        :param children: Optional list of Post replying to this one. (None as default.)
+        :param parallel: Whether each reply, with its own replies, is posted alongside the others. (False as default.)
+        """
+        self.message = message
+        self.key = key
+        self.children = list() if children is None else children
+        self.parallel = parallel
+
+
+class ThreadBuilder:
+    """Posts a thread, chaining every reply to the id of the status it answers."""
+
+    def __init__(self, api, username, posting_scheduler=None, journal=None):
+        """
+        Takes an authenticated Tweepy Api Object, the account's username, the posting scheduler and the journal.
+
+        :param api: An authenticated Tweepy Api Object.
+        :param username: Twitter account username without @.
+        :param posting_scheduler: PostingScheduler that paces the tweets. (A new one as default.)
+        :param journal: Optional ThreadJournal the posts are saved to and skipped from, if already posted. (None as default.)
+        """
+        self.api = api
+        self.username = username
+        self.posting_scheduler = PostingScheduler() if posting_scheduler is None else posting_scheduler
+        self.journal = journal
+        self.header_posted_at = None  # Seconds since the epoch when the last header was posted, None if it was posted before a restart.
+        # Only resolved for real apis, so a failing post in a dry run neither loads Tweepy nor is hidden by its absence.
+        self._rate_limit_errors = getattr(api, "rate_limit_errors", None)
+        if self._rate_limit_errors is None:
+            self._rate_limit_errors = tweepy.RateLimitError
+
+    def post(self, message, parent_id=None, key=None):
+        """
+        Takes a message, the id of the status it answers and its key, posts it when the rate limit allows and returns the new status' id.
+
+        :param message: Desired message.
+        :param parent_id: The id of the tweet to be replied. (None as default, which posts a standalone tweet.)
+        :param key: Optional key of the post in the thread, for the journal. (None as default.)
+
+        :return: Int with the id of the status created, or posted before, according to the journal.
+        """
+        if self.journal is not None and key is not None:
+            status_id = self.journal.get(key)
+            if status_id is not None:
+                return status_id
+
+        while True:
+            METRICS.observe("tweet_throttle_seconds", self.posting_scheduler.acquire())
+            try:
+                with METRICS.timer("tweet_post_seconds"):
+                    if parent_id is None:
+                        status = tweet(self.api, message)
+                    else:
+                        status = reply(self.api, message, self.username, parent_id)
+            except self._rate_limit_errors as error:
+                METRICS.increment("tweet_rate_limited_total")
+                self.posting_scheduler.exhaust(error.response)
+            else:
+                self.posting_scheduler.update(getattr(self.api, "last_response", None))
+                if self.journal is not None and key is not None:
+                    self.journal.record(key, status.id)
+                return status.id
+
+    def plan(self, daily_header, currencies_text, stock_indexes_text, news_list):
+        """
+        Takes the data returned by get_data and returns the thread as a tree of posts.
+
+        The header's replies keep their order, while each news website is a branch of its own, posted
+        alongside the others. The quotes and each website's news are packed in as few replies as fit.
+
+        :param daily_header: String for the first tweet.
+        :param currencies_text: String for the currencies reply, or None to leave it out.
+        :param stock_indexes_text: String for the stock indexes reply, or None to leave it out.
+        :param news_list: List of tuples with the website name and its news, as returned by compose_data.
+
+        :return: The daily header's Post.
+        """
+        prefix = "@" + self.username + "\n"  # Added by reply.
+
+        quotes = [text.strip() for text in (currencies_text, stock_indexes_text) if text is not None]  # None when its source failed.
+        replies = [Post(text, f"quotes/{index}") for index, text in enumerate(pack_texts(quotes, prefix))]
+
+        if news_list:
+            websites = [
+                Post(website_name, f"news/{website_index}", [
+                    Post(text, f"news/{website_index}/{text_index}") for text_index, text in enumerate(pack_texts(text_list, prefix))
+                ])
+                for website_index, (website_name, text_list) in enumerate(news_list)
+            ]
+            replies.append(Post("Notícias:", "news", websites, parallel=True))
+            #                    News
+
+        return Post(daily_header, "header", replies)
+
+    def post_tree(self, post, parent_id=None):
+        """
+        Takes a Post and the id of the status it answers and posts it and its replies.
+
+        The replies of a parallel post are posted by one thread each, sharing the rate limit, so the
+        time taken is the longest branch's instead of the sum of all of them.
+
+        :param post: Desired Post.
+        :param parent_id: The id of the tweet to be replied. (None as default, which posts a standalone tweet.)
+
+        :return: Int with the id of the post's status.
+        """
+        post_id = self.post(post.message, parent_id, post.key)
+
+        if post.parallel and len(post.children) > 1:
+            with ThreadPoolExecutor(max_workers=min(len(post.children), MAX_PARALLEL_BRANCHES)) as executor:
+                futures = [executor.submit(self.post_tree, child, post_id) for child in post.children]
+            for future in futures:
+                future.result()  # Raises the first branch's error, after every branch went as far as it could.
+        else:
+            for child in post.children:
+                self.post_tree(child, post_id)
+
+        return post_id
+
+    def build(self, daily_header, currencies_text, stock_indexes_text, news_list):
+        """
+        Takes the data returned by get_data and posts the whole thread.
+
+        :param daily_header: String for the first tweet.
+        :param currencies_text: String for the currencies reply, or None to leave it out.
+        :param stock_indexes_text: String for the stock indexes reply, or None to leave it out.
+        :param news_list: List of tuples with the website name and its news, as returned by compose_data.
+
+        :return: Int with the id of the daily header's status.
+        """
+        header = self.plan(daily_header, currencies_text, stock_indexes_text, news_list)
+
+        resumed = self.journal is not None and self.journal.get(header.key) is not None
+        daily_header_id = self.post(header.message, key=header.key)
+        if not resumed:
+            self.header_posted_at = time.time()
+
+        for child in header.children:
+            self.post_tree(child, daily_header_id)
+
+        return daily_header_id
+
+
+# DAILY HEADER
+
+
+def get_daily_header(timezone, instant=None):
+    """
+    Takes a timezone and returns a header for the daily tweets.
+
+    :param timezone: Desired timezone. (Timezones available at https://stackoverflow.com/q/13866926.)
+    :param instant: Optional aware datetime the header refers to. (The current time as default.)
+
+    :return: A formated string for the first tweet.
+    """
+    TIMEZONE = pytz.timezone(timezone)
+    now = datetime.datetime.now(TIMEZONE) if instant is None else instant.astimezone(TIMEZONE)
+
+    minute = now.minute
+    hour = now.hour
+    day = now.day
+    month = now.month
+    year = now.year
+    offset = now.strftime("%z")  # Such as -0400.
+
+    if hour >= 0 and hour <= 11:
+        greeting = "Bom dia. "
+    #               Good morning
+    elif hour >= 12 and hour <= 17:
+        greeting = "Boa tarde. "
+    #               Good afternoon
+    elif hour >= 18 and hour <= 23:
+        greeting = "Boa noite. "
+    #               Good evening
+    else:
+        greeting = ""
+
+    header = (
+        f"{greeting}\n\nHoje é dia {day:0>2}/{month:0>2}/{year}.\n\n"
+        #               Today is the day
+        + f"Agora são {hour:0>2}h{minute:0>2} (GMT {offset[:3]}:{offset[3:]}).\n\nAtualizações:"
+        #  It is (Timewise)                     The timezone's offset         Updates
+    )
+    return header
+
+
+# QUOTE HISTORY
+
+
+QUOTE_HISTORY_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "quote_history")
+QUOTE_HISTORY_MAGIC = b"IBQHIST1"
+QUOTE_HISTORY_HEADER_SIZE = 4096  # Bytes before the first row: magic, row count, column count and the columns' names.
+QUOTE_HISTORY_INITIAL_ROWS = 1024  # Rows the file has room for when created. It doubles when full.
+QUOTE_HISTORY_INTERVAL = 10 * 60  # Seconds after a row during which fetched quotes are not recorded again, such as by the pre-run refresh.
+QUOTE_DELTA_PERIOD = 24 * 60 * 60  # Seconds back the currencies' change is computed from.
+QUOTE_DELTA_TOLERANCE = 12 * 60 * 60  # Seconds older than the period a quote may be and still be compared with.
+
+
+def parse_quote(text):
+    """
+    Takes a number formated in Portuguese, such as "+1.234,56%", and returns it as a float.
+
+    :param text: Desired string.
+
+    :return: A float.
+    """
+    return float(text.strip().rstrip("%").replace(".", "").replace(",", "."))
+
+
+def format_quote(number, sign=False):
+    """
+    Takes a number and returns it formated in Portuguese with two decimals, such as "1.234,56".
+
+    :param number: Desired number.
+    :param sign: Whether positive numbers get a "+". (False as default.)
+
+    :return: A formated string.
+    """
+    text = f"{number:+,.2f}" if sign else f"{number:,.2f}"
+
+    return text.translate(str.maketrans(",.", ".,"))
+
+
+class QuoteHistory:
+    """
+    Append-only time series of quotes in a memory-mapped file, one float64 column per instrument.
+
+    Each row is the time followed by one value per column, NaN where an instrument is missing. The
+    rows are kept in time order, so any range is found by binary search over the mapped file
+    without reading it. The row count in the header is only updated after the row is written.
+    """
+
+    def __init__(self, path, columns):
+        """
+        Takes the file path and the instruments' names, and opens the file, creating it if needed.
+
+        A file missing some of the columns is rewritten with them added, and an unreadable one is replaced.
+
+        :param path: Path of the file.
+        :param columns: List of the instruments' names.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+
+        try:
+            self._open()
+        except (OSError, ValueError, struct.error):
+            self._create(list(columns))
+            self._open()
+
+        missing = [column for column in columns if column not in self.columns]
+        if missing:
+            rows = [
+                (timestamp,) + tuple(values.get(column, math.nan) for column in self.columns + missing)
+                for timestamp, values in self.range()
+            ]
+            self.close()
+            self._create(self.columns + missing, rows)
+            self._open()
+
+    def _create(self, columns, rows=()):
+        """Takes the columns and the rows as tuples of floats and writes a new file with them, replacing the old one atomically."""
+        names = json.dumps(columns).encode("utf-8")
+        if 20 + len(names) > QUOTE_HISTORY_HEADER_SIZE:
+            raise ValueError("Too many columns for the header.")
+
+        row_format = f"<{len(columns) + 1}d"
+        capacity = max(QUOTE_HISTORY_INITIAL_ROWS, 2 * len(rows))
+        temporary_path = self.path + ".tmp"
+
+        with open(temporary_path, "wb") as file:
+            file.write(struct.pack("<8sIII", QUOTE_HISTORY_MAGIC, len(rows), len(columns), len(names)) + names)
+            file.seek(QUOTE_HISTORY_HEADER_SIZE)
+            for row in rows:
+                file.write(struct.pack(row_format, *row))
+            file.truncate(QUOTE_HISTORY_HEADER_SIZE + capacity * struct.calcsize(row_format))
+        os.replace(temporary_path, self.path)
+
+    def _open(self):
+        """Maps the file and reads its header."""
+        self._file = open(self.path, "r+b")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0)
+        except ValueError:  # Empty file.
+            self._file.close()
+            raise
+
+        try:
+            magic, self._rows, column_count, names_length = struct.unpack_from("<8sIII", self._map, 0)
+            if magic != QUOTE_HISTORY_MAGIC:
+                raise ValueError(f"{self.path} is not a quote history.")
+            self.columns = json.loads(bytes(self._map[20:20 + names_length]).decode("utf-8"))
+        except (ValueError, struct.error):
+            self.close()
+            raise
+
+        self._row_format = f"<{column_count + 1}d"
+        self._row_size = struct.calcsize(self._row_format)
+        self._capacity = (len(self._map) - QUOTE_HISTORY_HEADER_SIZE) // self._row_size
+        self._rows = min(self._rows, self._capacity)
+
+    def close(self):
+        """Unmaps and closes the file."""
+        self._map.close()
+        self._file.close()
+
+    def _time(self, index):
+        """Takes a row index and returns its time."""
+        return struct.unpack_from("<d", self._map, QUOTE_HISTORY_HEADER_SIZE + index * self._row_size)[0]
+
+    def _row(self, index):
+        """Takes a row index and returns its time and a dict of column -> value, leaving out the missing values."""
+        row = struct.unpack_from(self._row_format, self._map, QUOTE_HISTORY_HEADER_SIZE + index * self._row_size)
+
+        return row[0], {column: value for column, value in zip(self.columns, row[1:]) if not math.isnan(value)}
+
+    def _bisect(self, timestamp, inclusive=False):
+        """Takes a time and returns the index of the first row after it, or at or after it if inclusive."""
+        low, high = 0, self._rows
+
+        while low < high:
+            middle = (low + high) // 2
+            if self._time(middle) < timestamp or (not inclusive and self._time(middle) == timestamp):
+                low = middle + 1
+            else:
+                high = middle
+
+        return low
+
+    def append(self, values, timestamp=None, min_interval=0):
+        """
+        Takes the instruments' values and appends them as a row, growing the file when it is full.
+
+        :param values: Dict of column -> float. Columns left out are stored as missing.
+        :param timestamp: Seconds since the epoch. (The current time as default.) Never earlier than the last row's.
+        :param min_interval: Seconds after the last row during which nothing is appended. (0 as default.)
+
+        :return: Bool with whether the row was appended.
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+
+        with self._lock:
+            if self._rows:
+                if timestamp - self._time(self._rows - 1) < min_interval:
+                    return False
+                timestamp = max(timestamp, self._time(self._rows - 1))
+
+            if self._rows == self._capacity:
+                self._map.close()
+                self._file.truncate(QUOTE_HISTORY_HEADER_SIZE + 2 * self._capacity * self._row_size)
+                self._map = mmap.mmap(self._file.fileno(), 0)
+                self._capacity *= 2
+
+            row = [timestamp] + [values.get(column, math.nan) for column in self.columns]
+            struct.pack_into(self._row_format, self._map, QUOTE_HISTORY_HEADER_SIZE + self._rows * self._row_size, *row)
+            self._rows += 1
+            struct.pack_into("<I", self._map, 8, self._rows)
+            self._map.flush()
+
+        return True
+
+    def range(self, start=-math.inf, end=math.inf):
+        """
+        Takes a time range and returns its rows.
+
+        :param start: Seconds since the epoch, inclusive. (The first row as default.)
+        :param end: Seconds since the epoch, exclusive. (After the last row as default.)
+
+        :return: List of tuples with the time and a dict of column -> value.
+        """
+        with self._lock:
+            rows = list()
+            for index in range(self._bisect(start, inclusive=True), self._rows):
+                timestamp, values = self._row(index)
+                if timestamp >= end:
+                    break
+                rows.append((timestamp, values))
+
+        return rows
+
+    def last_before(self, column, timestamp):
+        """
+        Takes a column and a time and returns the last value of the column at or before it.
+
+        :param column: Instrument's name.
+        :param timestamp: Seconds since the epoch.
+
+        :return: Tuple with the row's time and the value, or None.
+        """
+        with self._lock:
+            index = self._bisect(timestamp)
+            while index > 0:
+                index -= 1
+                row_time, values = self._row(index)
+                if column in values:
+                    return row_time, values[column]
+
+        return None
+
+    def get_change(self, column, value, timestamp=None, period=QUOTE_DELTA_PERIOD, tolerance=QUOTE_DELTA_TOLERANCE):
+        """
+        Takes an instrument and its current value and returns its change since a period ago.
+
+        :param column: Instrument's name.
+        :param value: Current value.
+        :param timestamp: Seconds since the epoch of the current value. (The current time as default.)
+        :param period: Seconds back the value is compared with. (QUOTE_DELTA_PERIOD as default.)
+        :param tolerance: Seconds older than the period the compared value may be. (QUOTE_DELTA_TOLERANCE as default.)
+
+        :return: Tuple with the change and the change's percentage, or None if there is no value to compare with.
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        previous = self.last_before(column, timestamp - period)
+
+        if previous is None or previous[0] < timestamp - period - tolerance or previous[1] == 0:
+            return None
+
+        return value - previous[1], (value - previous[1]) / previous[1] * 100
+
+
+_quote_histories = dict()
+_quote_histories_lock = threading.Lock()
+
+
+def get_quote_history(name, columns):
+    """
+    Takes a name and the instruments' names and returns the process-wide QuoteHistory stored at QUOTE_HISTORY_DIRECTORY/<name>.bin.
+
+    :param name: Name of the series, such as "currencies".
+    :param columns: List of the instruments' names.
+
+    :return: A shared QuoteHistory.
+    """
+    with _quote_histories_lock:
+        if name not in _quote_histories:
+            os.makedirs(QUOTE_HISTORY_DIRECTORY, exist_ok=True)
+            _quote_histories[name] = QuoteHistory(os.path.join(QUOTE_HISTORY_DIRECTORY, name + ".bin"), columns)
+
+        return _quote_histories[name]
+
+
+# CURRENCIES
+
+
+CURRENCIES = {
+    "1 USD": "https://dolarhoje.com/",
+    "1 EUR": "https://dolarhoje.com/euro-hoje/",
+    "1 GBP": "https://dolarhoje.com/libra-hoje/",
+    "1 BTC": "https://dolarhoje.com/bitcoin-hoje/",
+    "1 NANO": "https://dolarhoje.com/nano-hoje/",
+    "1 g de ouro": "https://dolarhoje.com/ouro-hoje/",
+}
+
+CURRENCY_PATTERNS = [re.compile(r"id=\"nacional\" value=\"(?P<value>\d+,\d\d)\"")]
+
+TROY_OUNCE_GRAMS = 31.1034768
+
+# Currency converter's pair and the factor its rate is multiplied by, for each currency it has.
+CURRENCY_CONVERTER_PAIRS = {
+    "1 USD": ("USD_BRL", 1),
+    "1 EUR": ("EUR_BRL", 1),
+    "1 GBP": ("GBP_BRL", 1),
+    "1 BTC": ("BTC_BRL", 1),
+    "1 g de ouro": ("XAU_BRL", 1 / TROY_OUNCE_GRAMS),  # Quoted per troy ounce.
+}
+CURRENCY_CONVERTER_URL = "https://free.currconv.com/api/v7/convert"
+CURRENCY_CONVERTER_PAIRS_PER_REQUEST = 2  # The most the free plan accepts. Raise it with a paid key to get every pair at once.
+QUOTE_CACHE_TTL = 60  # Seconds a currency's quote is reused, by any profile, before it is requested again.
+
+
+class QuoteProvider:
+    """
+    Source of currencies' prices in reais, tried in order by get_currencies.
+
+    Subclasses return the quotes of the currencies they have and leave the others out, so the next
+    provider is asked only for those.
+    """
+
+    name = "quote provider"
+
+    def get_quotes(self, currencies):
+        """
+        Takes the currencies wanted and returns the quotes found.
+
+        :param currencies: List of CURRENCIES keys.
+
+        :return: Dict of currency -> float with its price in reais.
+        """
+        raise NotImplementedError
+
+    def gather_parts(self, functions):
+        """
+        Takes argumentless functions, each getting part of the quotes, and runs them concurrently, each one failing on its own.
+
+        :param functions: List of argumentless functions.
+
+        :return: List with each function's result, in the same order, or None for the ones that raised.
+        """
+        def run(function):
+            try:
+                return function()
+            except Exception as error:
+                print(f"Part of the quotes from {self.name} failed: {error!r}")
+                METRICS.increment("quote_provider_failures_total", provider=self.name)
+                return None
+
+        return gather(*[functools.partial(run, function) for function in functions])
+
+
+@handle_http_error
+def fetch_json(url, params=None):
+    """
+    Takes an url and its query parameters and returns the decoded json response.
+
+    :param url: Desired web address.
+    :param params: Optional dict of query parameters.
+
+    :return: The decoded json.
+    """
+    return http_get(url, params=params).json()
+
+
+class CurrencyConverterProvider(QuoteProvider):
+    """Currency converter's json Api, asked for many pairs per request."""
+
+    name = "currency converter"
+
+    def __init__(self, CURRENCY_CONVERTER_KEY, pairs_per_request=CURRENCY_CONVERTER_PAIRS_PER_REQUEST):
+        """
+        Takes the Api key and how many pairs are asked per request.
+
+        :param CURRENCY_CONVERTER_KEY: Currency converter's Api key.
+        :param pairs_per_request: Pairs asked in each request. (CURRENCY_CONVERTER_PAIRS_PER_REQUEST as default.)
+        """
+        self.CURRENCY_CONVERTER_KEY = CURRENCY_CONVERTER_KEY
+        self.pairs_per_request = pairs_per_request
+
+    def get_quotes(self, currencies):
+        pairs = {currency: CURRENCY_CONVERTER_PAIRS[currency] for currency in currencies if currency in CURRENCY_CONVERTER_PAIRS}
+        names = sorted({pair for pair, _ in pairs.values()})
+        chunks = [names[start:start + self.pairs_per_request] for start in range(0, len(names), self.pairs_per_request)]
+
+        rates = dict()
+        for response in self.gather_parts([
+            functools.partial(fetch_json, CURRENCY_CONVERTER_URL, dict(q=",".join(chunk), compact="ultra", apiKey=self.CURRENCY_CONVERTER_KEY))
+            for chunk in chunks
+        ]):
+            rates.update(response or dict())
+
+        return {currency: float(rates[pair]) * factor for currency, (pair, factor) in pairs.items() if pair in rates}
+
+
+class DolarHojeProvider(QuoteProvider):
+    """Dolar Hoje's pages, one per currency, scraped for their price in reais."""
+
+    name = "dolar hoje"
+
+    def get_quotes(self, currencies):
+        currencies = [currency for currency in currencies if currency in CURRENCIES]
+        values = self.gather_parts([functools.partial(self.get_quote, currency) for currency in currencies])
+
+        return {currency: value for currency, value in zip(currencies, values) if value is not None}
+
+    def get_quote(self, currency):
+        """Takes a CURRENCIES key and returns its price in reais, scraped from its page."""
+        return parse_quote(fetch_values(CURRENCIES[currency], CURRENCY_PATTERNS)["value"])
+
+
+class QuoteCache:
+    """The last quote of each currency, reused for a short time by every profile and run of the process."""
+
+    def __init__(self, ttl=QUOTE_CACHE_TTL):
+        """
+        Takes how long a quote is reused.
+
+        :param ttl: Seconds a quote is reused. (QUOTE_CACHE_TTL as default.)
+        """
+        self.ttl = ttl
+        self._quotes = dict()  # currency -> (value, fetched_at)
+        self._lock = threading.Lock()
+
+    def get(self, currencies):
+        """Takes the currencies wanted and returns a dict with the ones cached and still fresh."""
+        now = time.time()
+
+        with self._lock:
+            return {
+                currency: self._quotes[currency][0] for currency in currencies
+                if currency in self._quotes and now - self._quotes[currency][1] <= self.ttl
+            }
+
+    def put(self, quotes):
+        """Takes a dict of currency -> value and caches it."""
+        now = time.time()
+
+        with self._lock:
+            for currency, value in quotes.items():
+                self._quotes[currency] = (value, now)
+
+
+QUOTE_CACHE = QuoteCache()
+
+
+def get_quote_providers(CURRENCY_CONVERTER_KEY):
+    """
+    Takes the currency converter key and returns the quote providers in the order they are tried.
+
+    :param CURRENCY_CONVERTER_KEY: Currency converter's Api key, or an empty string to only scrape.
+
+    :return: List of QuoteProvider.
+    """
+    providers = list()
+
+    if CURRENCY_CONVERTER_KEY:
+        providers.append(CurrencyConverterProvider(CURRENCY_CONVERTER_KEY))
+    providers.append(DolarHojeProvider())
+
+    return providers
+
+
+def get_currencies(CURRENCY_CONVERTER_KEY):
+    """
+    Returns a string with some currencies' prices in reais.
+
+    The quotes cached by QUOTE_CACHE are reused and each provider is only asked for the currencies
+    the previous ones did not have or failed to give. Only the quotes fetched from the providers
+    are recorded in the history.
+
+    :param CURRENCY_CONVERTER_KEY: Currency converter's Api key, or an empty string to only scrape.
+
+    :return: Formated string for the currencies reply.
+    """
+    values = QUOTE_CACHE.get(list(CURRENCIES))
+    fetched = dict()
+
+    for provider in get_quote_providers(CURRENCY_CONVERTER_KEY):
+        missing = [currency for currency in CURRENCIES if currency not in values]
+        if not missing:
+            break
+
+        try:
+            with METRICS.timer("quote_provider_seconds", provider=provider.name):
+                quotes = provider.get_quotes(missing)
+        except Exception as error:
+            print(f"Quotes from {provider.name} failed: {error!r}")
+            METRICS.increment("quote_provider_failures_total", provider=provider.name)
+            continue
+
+        QUOTE_CACHE.put(quotes)
+        values.update(quotes)
+        fetched.update(quotes)
+
+    missing = [currency for currency in CURRENCIES if currency not in values]
+    if missing:
+        raise CouldNotParseError(f"No quote found for {', '.join(missing)}.")
+
+    now = time.time()
+    history = get_quote_history("currencies", list(CURRENCIES))
+    if fetched:
+        history.append(fetched, now, QUOTE_HISTORY_INTERVAL)
+
+    final_text = ""
+
+    for currency in CURRENCIES:
+        change = history.get_change(currency, values[currency], now)
+        if change is None:  # No quote from a day ago yet.
+            final_text += f"{currency}  -  R${format_quote(values[currency])}\n"
+        else:
+            final_text += f"{currency}  -  R${format_quote(values[currency])} ({format_quote(change[0], sign=True)} | {format_quote(change[1], sign=True)}%)\n"
+
+    return final_text
+
+
+# STOCK INDEXES
+
+
+INDEXES = {
+    "IBOVESPA (BRL)": "https://br.investing.com/indices/bovespa",
+    "EWZ (USD)": "https://br.investing.com/etfs/ishares-brazil-index",
+    "S&P 500 (USD)": "https://br.investing.com/indices/us-spx-500",
+    "DIA (USD)": "https://br.investing.com/etfs/diamonds-trust",
+    "Brent Oil (USD)": "https://br.investing.com/commodities/brent-oil-opinion/",
+}
+
+# A single pattern for the last value, the change and the change's percentage, so each page is scanned
+# once. It starts with a literal, which the regex engine jumps between, and only uses bounded
+# character classes that cannot run past the tag, so a failed attempt costs at most the length of
+# one tag, whatever the page.
+INDEX_PATTERNS = [
+    re.compile(
+        r"<span class=\"(?:"
+        r"[^\"<>]{0,100}\" id=\"last_last\"[^<>]{0,200}>(?P<value>[^<]{1,40})"
+        r"|[^\"<>]{0,100}(?:green|red)Font[^<>]{0,200}>(?:"
+        r"(?P<change_percentage>[+-]\d{1,12}(?:\.\d{3})*,\d\d%)"
+        r"|(?P<change>[+-]\d{1,12}(?:\.\d{3})*,\d\d)"
+        r"))</span>"
+    ),
+]
+INDEX_PARSE_BUDGET = 0.25  # Seconds the searches of one index page may take before the page is given up.
+
+
+def get_stock_indexes():
+    """
+    Returns a string with some stocks' share prices.
+
+    :return: Formated string for the stock Indexes reply.
+    """
+    quotes = gather(*[functools.partial(fetch_values, link, INDEX_PATTERNS, budget=INDEX_PARSE_BUDGET) for link in INDEXES.values()])
+
+    values = dict()
+    for index, quote in zip(INDEXES, quotes):
+        try:
+            values[index] = parse_quote(quote["value"])
+        except ValueError:  # Left out of the history, but still tweeted as found.
+            pass
+    get_quote_history("stock_indexes", list(INDEXES)).append(values, min_interval=QUOTE_HISTORY_INTERVAL)
+
+    final_text = ""
+
+    for index, quote in zip(INDEXES, quotes):
+        final_text += f"{index}  -  {quote['value']} ({quote['change']} | {quote['change_percentage']})\n"
+
+    return final_text
+
+
+# NEWS
+
+
+NEWS_CACHE_TTL = 10 * 60  # Seconds a news front page is reused without being requested again.
+
+
+class NewsSource:
+    """
+    Declarative description of a news website, run by get_news_items.
+
+    Every match of the pattern is one news item and the pattern's named groups are its fields. It
+    must have at least "link" and "title". Field patterns are searched inside each match for extra
+    fields, and items where any of them is missing are dropped.
+    """
+
+    def __init__(self, name, url, pattern, field_patterns=None, headers=None, top_n=5, rank_key=None, title_format="{title}", ttl=NEWS_CACHE_TTL):
+        """
+        Takes the website's description.
+
+        :param name: Website name, used as its reply in the thread.
+        :param url: Address of the front page. Relative links are resolved against it.
+        :param pattern: Compiled pattern whose matches are the news items.
+        :param field_patterns: Optional list of compiled patterns searched inside each match for more fields.
+        :param headers: Optional headers for the front page's request.
+        :param top_n: Amount of news tweeted. (5 as default.)
+        :param rank_key: Optional function taking an item and returning the value it is sorted by, in descending order. (Page order as default.)
+        :param title_format: Format string for the tweeted title, filled with the item's fields. ("{title}" as default.)
+        :param ttl: Seconds the front page is served from the response cache. (NEWS_CACHE_TTL as default.)
+        """
+        self.name = name
+        self.url = url
+        self.pattern = pattern
+        self.field_patterns = list() if field_patterns is None else field_patterns
+        self.headers = headers
+        self.top_n = top_n
+        self.rank_key = rank_key
+        self.title_format = title_format
+        self.ttl = ttl
+
+
+NEWS_SOURCES = {
+    "the_economist": NewsSource(
+        name="The Economist",
+        url="https://economist.com",
+        pattern=re.compile(
+            r"<a class=\"headline-link\" href=\"(?P<link>.+?)\"><span.*?>(?P<title>.+?)<\/span><\/a>"
+        ),
+    ),
+    "the_wall_street_journal": NewsSource(
+        name="The Wall Street Journal",
+        url="https://www.wsj.com/",
+        pattern=re.compile(
+            r"<a class=\"\" href=\"(?P<link>https://www.wsj.com/articles/.*?)\"><span class=\"WSJTheme--headlineText--He1ANr9C \">(?P<title>.*?)</span></a>"
+        ),
+    ),
+    "o_antagonista": NewsSource(
+        name="O Antagonista",
+        url="https://www.oantagonista.com",
+        pattern=re.compile(
+            r"<div class=\"article_link\">.*\n.*<a href=\"(?P<link>.+?)\" title=\"(?P<title>.+?)\".*class=\"link_post\">"
+        ),
+    ),
+    "insurgere": NewsSource(
+        name="Insurgere",
+        url="https://insurgere.com.br",
+        pattern=re.compile(
+            r"<h2 class=\"entry-title\"><a href=\"(?P<link>.+?)\" rel=\"bookmark\">(?P<title>.+?)<\/a><\/h2>"
+        ),
+        headers={
+            "User-agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_9_3) AppleWebKit/537.75.14 (KHTML, like Gecko) Version/7.0.3 Safari/7046A194A"
+        },
+    ),
+    "hacker_news": NewsSource(
+        name="Hacker News",
+        url="https://news.ycombinator.com/news",
+        pattern=re.compile(r"<tr class=\'athing\' id=\'\d+\'>.*?\n.*?\n.*?<\/td><\/tr>"),
+        field_patterns=[
+            re.compile(r"<a href=\"(?P<link>.+?)\" class=\"storylink\">(?P<title>.+?)<\/a>"),
+            re.compile(r"(?P<votes>\d+) points"),
+        ],
+        rank_key=lambda item: int(item["votes"]),
+        title_format="({votes} votos) {title}",
+    ),
+}
+
+# Keys of NEWS_SOURCES tweeted, in order.
+ENABLED_NEWS_SOURCES = ["the_economist", "the_wall_street_journal", "hacker_news"]
+
+
+def extract_news_items(source, page):
+    """
+    Takes a NewsSource and its front page and returns every news item found, ranked.
+
+    :param source: Desired NewsSource.
+    :param page: String with the front page's text.
+
+    :return: List of dicts with the items' fields, the link made absolute and the title unescaped.
+    """
+    items = list()
+
+    for match in source.pattern.finditer(page):
+        item = match.groupdict()
+
+        for field_pattern in source.field_patterns:
+            field_match = field_pattern.search(match.group(0))
+            if field_match is None:
+                break
+            item.update(field_match.groupdict())
+        else:
+            item["link"] = urljoin(source.url, item["link"])
+            item["title"] = html.unescape(item["title"])
+            items.append(item)
+
+    if source.rank_key is not None:
+        items.sort(key=source.rank_key, reverse=True)
+
+    return items
+
+
+def get_news_items(source):
+    """
+    Takes a NewsSource, fetches its front page and returns every news item found, ranked.
+
+    :param source: Desired NewsSource.
+
+    :return: List of dicts with the items' fields.
+    """
+    page = fetch_page(source.url, headers=source.headers, ttl=source.ttl)
+
+    with METRICS.timer("parse_seconds", kind="news", source=source.name):
+        return extract_news_items(source, page)
+
+
+def format_news(source, items):
+    """
+    Takes a NewsSource and some of its items and returns the texts of their tweets, with the links shortened when possible.
+
+    :param source: Desired NewsSource.
+    :param items: List of items, as returned by get_news_items.
+
+    :return: List of strings with the news' titles and links.
+    """
+    short_urls = shorten_urls([item["link"] for item in items])
+
+    text_list = list()
+
+    for item, short_url in zip(items, short_urls):
+        text = truncate_tweet_text(source.title_format.format(**item), NEWS_TITLE_MAX_WEIGHT)  # Fits a reply of its own.
+        text_list.append(f"{text}\n\n{short_url}")
+
+    return text_list
+
+
+def get_ranked_news(source):
+    """
+    Takes a NewsSource and returns every news item found, ranked, making sure there are at least enough for its top news.
+
+    :param source: Desired NewsSource.
+
+    :return: List of dicts with the items' fields, as returned by get_news_items.
+    """
+    items = get_news_items(source)
+
+    if len(items) < source.top_n:
+        raise IndexError(f"Only {len(items)} news found at {source.name}.")
+
+    return items
+
+
+# SEEN NEWS
+
+
+SEEN_NEWS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "seen_news.sqlite3")
+SEEN_NEWS_RETENTION = 7 * 24 * 60 * 60  # Seconds a tweeted news item is remembered.
+
+
+def get_canonical_url(url):
+    """
+    Takes an url and returns the form used to recognize it, without scheme, "www.", fragment, tracking parameters or trailing slash.
+
+    :param url: Desired url.
+
+    :return: A string.
+    """
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[len("www."):]
+
+    query = "&".join(
+        parameter for parameter in parts.query.split("&") if parameter and not parameter.lower().startswith("utm_")
+    )
+
+    return host + parts.path.rstrip("/") + ("?" + query if query else "")
+
+
+def get_title_hash(title):
+    """
+    Takes a news title and returns a hash that ignores case and whitespace.
+
+    :param title: Desired title.
+
+    :return: String with the hexadecimal sha1.
+    """
+    return hashlib.sha1(" ".join(title.casefold().split()).encode("utf-8")).hexdigest()
+
+
+class SeenStore:
+    """
+    The news items a profile already tweeted, kept in a SQLite file shared by every profile.
+
+    An item counts as seen if its canonical url or its title was tweeted within the retention window,
+    so a story keeps being recognized when either one changes.
+    """
+
+    def __init__(self, path, profile, retention=SEEN_NEWS_RETENTION):
+        """
+        Takes the file path, the profile's name and the retention window, and creates the table if needed.
+
+        :param path: Path of the SQLite file.
+        :param profile: Name of the profile whose items are stored, usually its username.
+        :param retention: Seconds an item is remembered. (SEEN_NEWS_RETENTION as default.)
+        """
+        self.path = path
+        self.profile = profile
+        self.retention = retention
+        self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._lock = threading.Lock()
+
+        with self._lock, self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS seen (profile TEXT, source TEXT, url TEXT, title_hash TEXT, posted_at REAL)"
+            )
+            self._connection.execute("CREATE INDEX IF NOT EXISTS seen_url ON seen (profile, url)")
+            self._connection.execute("CREATE INDEX IF NOT EXISTS seen_title_hash ON seen (profile, title_hash)")
+
+    def is_seen(self, item):
+        """
+        Takes a news item and returns whether it was tweeted within the retention window.
+
+        :param item: Dict with at least "link" and "title", as returned by get_news_items.
+
+        :return: Bool.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT 1 FROM seen WHERE profile = ? AND (url = ? OR title_hash = ?) AND posted_at >= ? LIMIT 1",
+                (self.profile, get_canonical_url(item["link"]), get_title_hash(item["title"]), time.time() - self.retention),
+            ).fetchone()
+
+        return row is not None
+
+    def add(self, source_key, items):
+        """
+        Takes a source key and the news items tweeted from it, stores them and forgets the ones past the retention window.
+
+        :param source_key: Source key, as returned by get_data_sources.
+        :param items: List of dicts, as returned by get_news_items.
+
+        :return: None
+        """
+        now = time.time()
+
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT INTO seen VALUES (?, ?, ?, ?, ?)",
+                [
+                    (self.profile, source_key, get_canonical_url(item["link"]), get_title_hash(item["title"]), now)
+                    for item in items
+                ],
+            )
+            self._connection.execute("DELETE FROM seen WHERE posted_at < ?", (now - self.retention,))
+
+
+# GET DATA
+
+
+DATA_DEADLINE = 2 * 60  # Seconds the sources have to answer before the stored data is used instead.
+LAST_KNOWN_GOOD_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "last_known_good.json")
+LAST_KNOWN_GOOD_MAX_AGE = 24 * 60 * 60  # Seconds stored data may be tweeted in place of a failed source.
+QUOTE_SOURCES = ["currencies", "stock_indexes"]
+SECTIONS = ["currencies", "stock_indexes", "news"]  # Sections of the thread, in order.
+
+
+class SourceResult:
+    """The outcome of gathering one source: fresh ("ok"), replaced by its last known good value ("stale") or missing ("failed")."""
+
+    OK = "ok"
+    STALE = "stale"
+    FAILED = "failed"
 
-        skips = get_skips_needed(schedule=schedule, timezone=timezone)
+    def __init__(self, key, status, value=None, fetched_at=None, error=None, items=None):
+        """
+        Takes the source's key, its status, its value, when the value was fetched, the error, if any, and the news items chosen.
 
-        first_time_looping = True
+        :param key: Source key, as returned by get_data_sources.
+        :param status: SourceResult.OK, SourceResult.STALE or SourceResult.FAILED.
+        :param value: The source's value. (None as default.)
+        :param fetched_at: Seconds since the epoch when the value was fetched. (None as default.)
+        :param error: The exception that made the source fail. (None as default.)
+        :param items: The news items the value was formatted from, as set by select_news. (None as default.)
+        """
+        self.key = key
+        self.status = status
+        self.value = value
+        self.fetched_at = fetched_at
+        self.error = error
+        self.items = items
 
-        while True:
-            schedule_iterator = iter(schedule)
 
-            for hour, minute in schedule_iterator:
-                if first_time_looping:
-                    first_time_looping = False
-                    if skips == 0:
-                        pass
-                    else:
-                        for _ in range(skips - 1):
-                            next(schedule_iterator)
-                        continue
+class LastKnownGood:
+    """The last value successfully gathered from each source, persisted to a json file."""
 
-                wait_until(hour=hour, minute=minute, timezone=timezone, enablezone=True)
+    def __init__(self, path):
+        """
+        Takes the file path and loads the values saved on it, ignoring a missing or corrupted file.
 
-                print(f"It's {hour}:{minute:0>2}! Starting...")
+        :param path: Path of the json file.
+        """
+        self.path = path
+        self._entries = dict()  # key -> [value, fetched_at]
+        self._lock = threading.Lock()
 
-                # GETTING DATA
+        try:
+            with open(path, encoding="utf-8") as file:
+                self._entries = json.load(file)
+        except (OSError, ValueError):
+            pass
 
-                print("Gathering data...")
+    def get(self, key, max_age=LAST_KNOWN_GOOD_MAX_AGE):
+        """
+        Takes a source key and returns its last value and when it was fetched, or None if there is none recent enough.
 
-                currencies_text, stock_indexes_text, news_list, daily_header = get_data(
-                    timezone=timezone,
-                    CURRENCY_CONVERTER_KEY=CURRENCY_CONVERTER_KEY,
-                )
+        :param key: Source key.
+        :param max_age: Seconds after which a value is not returned anymore. (LAST_KNOWN_GOOD_MAX_AGE as default.)
 
-                # TWEETING
+        :return: Tuple with the value and the seconds since the epoch when it was fetched, or None.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
 
-                api = authenticate(
-                    API_KEY, API_SECRET_KEY, ACCESS_TOKEN, ACCESS_TOKEN_SECRET
-                )
+        if entry is None or time.time() - entry[1] > max_age:
+            return None
 
-                # Daily Header
-                print("Tweeting...")
-                tweet(api, daily_header)
-                time.sleep(WAIT_BEFORE_NEXT_TWEET)
-                daily_header_id = get_my_last_tweet_id(api)
-
-                # Currencies
-                reply(api, currencies_text, username, daily_header_id)
-                time.sleep(WAIT_BEFORE_NEXT_TWEET)
-
-                # Stock Indexes
-                reply(api, stock_indexes_text, username, daily_header_id)
-                time.sleep(WAIT_BEFORE_NEXT_TWEET)
-
-                # News
-                reply(api, "Notícias:", username, daily_header_id)
-                #           News
-                time.sleep(WAIT_BEFORE_NEXT_TWEET)
-                news_id = get_my_last_tweet_id(api)
-
-                for website_name, text_list in news_list:
-                    reply(api, website_name, username, news_id)
-                    time.sleep(WAIT_BEFORE_NEXT_TWEET)
-                    website_name_id = get_my_last_tweet_id(api)
-                    for text in text_list:
-                        reply(api, text, username, website_name_id)
-                        time.sleep(WAIT_BEFORE_NEXT_TWEET)
-
-                print("Everything went well. Waiting for next iteration...")
-    except Exception as error:
-        if text_message:
-            while True:
-                try:
-                    send_me_an_text_message(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_NUMBER, MOBILE_NUMBER, ERROR_MESSAGE + "\n\n" + str(error))
-                except requests.exceptions.ConnectionError:
-                    pass
-                else:
-                    break
-        raise error
+        return tuple(entry)
 
+    def put(self, key, value, fetched_at):
+        """Takes a source key, its value and when it was fetched and stores them."""
+        with self._lock:
+            self._entries[key] = [value, fetched_at]
 
-# DEFINITIONS
+    def save(self):
+        """Saves the values to disk, replacing the previous file atomically."""
+        temporary_path = self.path + ".tmp"
 
+        with self._lock:
+            with open(temporary_path, "w", encoding="utf-8") as file:
+                json.dump(self._entries, file)
+            os.replace(temporary_path, self.path)
 
-# UTILITIES
 
+_last_known_good = None
+_last_known_good_lock = threading.Lock()
 
-class CouldNotConnectError(Exception):
-    """Raised when there was a problem with the connection."""
 
+def get_last_known_good():
+    """
+    Returns the process-wide LastKnownGood, loaded from LAST_KNOWN_GOOD_FILE on first use.
 
-def handle_http_error(func):
-    """Decorator that handles http errors."""
+    :return: A shared LastKnownGood.
+    """
+    global _last_known_good
 
-    def wrap(*args, **kwargs):
-        for _ in range(1200):
-            try:
-                return func(*args, **kwargs)
-            except (requests.exceptions.HTTPError, urllib.error.HTTPError) as err:
-                print("HANDLING!")
-                print(str(err))
-                time.sleep(3)
-            else:
-                break
-        else:
-            raise CouldNotConnectError("Connection to external sources timed out.")
+    with _last_known_good_lock:
+        if _last_known_good is None:
+            _last_known_good = LastKnownGood(LAST_KNOWN_GOOD_FILE)
 
-    return wrap
+        return _last_known_good
 
 
-@handle_http_error
-def shorten_url(url):
+def get_data_sources(CURRENCY_CONVERTER_KEY, news_sources=None, sections=None):
     """
-    Takes an url and returns it shortened.
+    Takes the currency converter key, the news sources and the sections and returns the function that gathers each source.
 
-    :param url: Desired web address.
+    :param CURRENCY_CONVERTER_KEY: Currency converter's Api key.
+    :param news_sources: Optional list of NEWS_SOURCES keys. (ENABLED_NEWS_SOURCES as default.)
+    :param sections: Optional list of SECTIONS keys to be gathered. (Every section as default.)
 
-    :return: Desired web address shortened. (http://tinyurl.com/XXXXXXXX)
+    :return: Dict of source key -> argumentless function, in the thread's order. News keys are "news/" plus the NEWS_SOURCES key
+        and their functions return the ranked items, to be chosen and formatted by select_news.
     """
-    request_url = "http://tinyurl.com/api-create.php?" + urlencode({"url": url})
+    sections = SECTIONS if sections is None else sections
+    functions = dict()
+
+    if "currencies" in sections:
+        functions["currencies"] = functools.partial(get_currencies, CURRENCY_CONVERTER_KEY)
+    if "stock_indexes" in sections:
+        functions["stock_indexes"] = get_stock_indexes
 
-    with contextlib.closing(urlopen(request_url)) as response:
-        return response.read().decode("utf-8")
+    if "news" in sections:
+        for key in ENABLED_NEWS_SOURCES if news_sources is None else news_sources:
+            functions["news/" + key] = functools.partial(get_ranked_news, NEWS_SOURCES[key])
 
+    return functions
 
-def send_me_an_text_message(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_NUMBER, MOBILE_NUMBER, text):
+
+def get_fallback_result(key, error):
     """
-    Sends a text message through twilio.
+    Takes a source key and the error that made it fail and returns its last known good value as a stale result, or a failed one.
 
-    :param TWILIO_ACCOUNT_SID: Twilio Account SID.
-    :param TWILIO_AUTH_TOKEN: Twilio Auth Token.
-    :param TWILIO_NUMBER: Twilio number.
-    :param MOBILE_NUMBER: Your mobile number.
-    :param text: Text message to send.
+    :param key: Source key, as returned by get_data_sources.
+    :param error: The exception that made the source fail.
 
-    :return: None
+    :return: A SourceResult.
     """
-    twilio_client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
-    twilio_client.messages.create(body=text, from_=TWILIO_NUMBER, to=MOBILE_NUMBER)
+    entry = get_last_known_good().get(key)
+
+    if entry is None:
+        print(f"{key} failed and has no recent data, skipping it: {error!r}")
+        return SourceResult(key, SourceResult.FAILED, error=error)
 
+    print(f"{key} failed, using its data from {datetime.datetime.fromtimestamp(entry[1]):%H:%M}: {error!r}")
+    return SourceResult(key, SourceResult.STALE, entry[0], entry[1], error)
 
-def wait_until(hour, minute, timezone, delay=0, advance=0, enablezone=False):
+
+def gather_sources(functions, deadline=DATA_DEADLINE):
     """
-    Takes an hour mark, a minute mark, and a timezone, and waits until the given time in the given timezone.
+    Takes the sources' functions and gathers them concurrently, each one failing on its own.
 
-    :param hour: Desired hour mark.
-    :param minute: Desired minute mark.
-    :param timezone: Desired timezone. (Timezones available at https://stackoverflow.com/q/13866926.)
-    :param delay: Optional delay. (0 as default.)
-    :param advance: Optional advance. (0 as default.)
-    :param enablezone: True: Enables the timezone feature. False: Disables the timezone feature. (False as default.)
+    A source that raises or does not finish before the deadline is replaced by its last known good
+    value, marked as stale, or marked as failed if there is none. Sources still running after the
+    deadline are left to finish in the background.
 
-    :return: None
+    :param functions: Dict of source key -> argumentless function, as returned by get_data_sources.
+    :param deadline: Seconds the sources have to finish. (DATA_DEADLINE as default.)
+
+    :return: Dict of source key -> SourceResult, in the same order.
     """
-    if enablezone:
-        TIMEZONE = pytz.timezone(timezone)
-        current_time = datetime.datetime.now(TIMEZONE)
-    else:
-        current_time = datetime.datetime.now()
+    last_known_good = get_last_known_good()
 
-    # Calculate the remaining time in seconds to complete an hour.
-    minutes_rest = ((59 + minute) - current_time.minute) * 60
-    seconds_rest = 60 - current_time.second
-    rest = minutes_rest + seconds_rest
+    def timed(key, function):
+        with METRICS.timer("source_fetch_seconds", source=key):
+            return function()
 
-    if current_time.hour < hour:
-        time_to_be_slept = ((hour - 1) - current_time.hour) * 60 * 60 + rest
-    elif (current_time.hour == hour) and (current_time.minute < minute):
-        time_to_be_slept = rest - 3600
-    else:
-        time_to_be_slept = ((23 + hour) - current_time.hour) * 60 * 60 + rest
+    executor = ThreadPoolExecutor(max_workers=min(len(functions), MAX_WORKERS))
+    futures = {key: executor.submit(timed, key, function) for key, function in functions.items()}
+    concurrent.futures.wait(futures.values(), timeout=deadline)
+    executor.shutdown(wait=False)
 
-    time_to_be_slept = time_to_be_slept + delay - advance
+    results = dict()
 
-    time_to_be_slept = (
-        0 if time_to_be_slept < 0 else time_to_be_slept
-    )  # Used to keep time nonnegative and to become 0 if negative.
+    for key, future in futures.items():
+        if future.done() and future.exception() is None:
+            fetched_at = time.time()
+            last_known_good.put(key, future.result(), fetched_at)
+            results[key] = SourceResult(key, SourceResult.OK, future.result(), fetched_at)
+            continue
 
-    time.sleep(time_to_be_slept)
+        error = future.exception() if future.done() else TimeoutError(f"Not finished after {deadline}s.")
+        results[key] = get_fallback_result(key, error)
 
+    last_known_good.save()
 
-# TWITTER
+    for key, result in results.items():
+        METRICS.increment("source_results_total", source=key, status=result.status)
+        if result.status != SourceResult.OK:
+            ALERTS.alert(f"source/{key}", f"{key} is {result.status}: {result.error!r}", level="warning")
 
+    return results
 
-def authenticate(API_KEY, API_SECRET_KEY, ACCESS_TOKEN, ACCESS_TOKEN_SECRET):
+
+def get_stale_note(fetched_at, timezone):
     """
-    Takes Twitter's Api Key, Api Secret Key, Access Token, and Access Token Secret, returns an authenticated Twitter Api Object.
+    Takes when a value was fetched and a timezone and returns the note appended to stale tweets.
 
-    :param API_KEY: Twitter's Api key.
-    :param API_SECRET_KEY: Twitter's Api secret key.
-    :param ACCESS_TOKEN: Twitter's Api access token.
-    :param ACCESS_TOKEN_SECRET: Twitter's Api access token secret.
+    :param fetched_at: Seconds since the epoch.
+    :param timezone: Desired timezone. (Timezones available at https://stackoverflow.com/q/13866926.)
 
-    :return: An authenticated Tweepy Api Object.
+    :return: A formated string.
     """
-    authentication = tweepy.OAuthHandler(API_KEY, API_SECRET_KEY)
-    authentication.set_access_token(ACCESS_TOKEN, ACCESS_TOKEN_SECRET)
+    fetched_at = datetime.datetime.fromtimestamp(fetched_at, pytz.timezone(timezone))
 
-    return tweepy.API(authentication)
+    return f"(Dados de {fetched_at.day:0>2}/{fetched_at.month:0>2} às {fetched_at.hour:0>2}h{fetched_at.minute:0>2})"
+    #         Data from                            at
 
 
-def tweet(api, message):
+def select_news(results, seen=None):
     """
-    Takes an authenticated Tweepy Api Object, a message and tweets it.
+    Takes the sources' results and returns them with the ranked items of each news source replaced by the texts of its top news.
 
-    :param api: An authenticated Tweepy Api Object.
-    :param message: Desired message to tweet.
+    With a SeenStore, the items already tweeted are passed over before the links are shortened, and a
+    source without new items gets an empty list, which leaves its section out of the thread.
 
-    return: None
+    :param results: Dict of source key -> SourceResult, as returned by gather_sources.
+    :param seen: Optional SeenStore of the profile. (None as default, which takes the top items as they are.)
+
+    :return: Dict of source key -> SourceResult, in the same order, with the chosen items in the news results' items.
     """
-    api.update_status(status=message)
+    selected = dict()
 
+    for key, result in results.items():
+        if not key.startswith("news/") or result.status == SourceResult.FAILED:
+            selected[key] = result
+            continue
 
-def reply(api, message, username, status_id):
-    """
-    Takes an authenticated Tweepy Api Object, a message, an username and a status id and replies it with the message.
+        source = NEWS_SOURCES[key[len("news/"):]]
+        items = result.value
 
-    :param api: An authenticated Tweepy Api Object.
-    :param message: Desired message to reply.
-    :param username: Twitter account username without @.
-    :param status_id: The id of the tweet to be replied.
+        if seen is not None:
+            new_items = [item for item in items if not seen.is_seen(item)]
+            METRICS.increment("news_items_total", len(items) - len(new_items), source=key, result="seen")
+            items = new_items
 
-    :return: None
-    """
-    api.update_status(
-        status="@" + username + "\n" + message,
-        in_reply_to_status_id=status_id,  # The @username must be used for the message to be recognized as a reply.
-    )
+        items = items[:source.top_n]
+        METRICS.increment("news_items_total", len(items), source=key, result="new")
+
+        selected[key] = SourceResult(key, result.status, format_news(source, items), result.fetched_at, result.error, items)
+
+    return selected
 
 
-def get_my_last_tweet_id(api):
+def compose_data(results, timezone, instant=None):
     """
-    Takes an authenticated Tweepy Api Object and returns the Twitter account's last tweet's id.
+    Takes the sources' results and returns the data for the thread, leaving failed sources out and marking stale ones.
 
-    :param api: An authenticated Tweepy Api Object.
+    :param results: Dict of source key -> SourceResult, as returned by select_news.
+    :param timezone: Desired timezone. (Timezones available at https://stackoverflow.com/q/13866926.)
+    :param instant: Optional aware datetime the header refers to. (The current time as default.)
 
-    :return: Int with Twitter account's last tweet's id.
+    :return: Tuple with the currencies' text, the stock indexes' text (None when failed), the news list and the daily header.
+        News sources that failed or have nothing new are left out of the news list.
     """
-    for _ in range(3):
-        try:
-            last_tweet = api.user_timeline(id=api.me().id, count=1)[0]
-        except IndexError:
-            time.sleep(3)
-            continue
-        else:
-            break
-    else:
-        raise Exception("The last tweet was not found.")
+    if all(result.status == SourceResult.FAILED for result in results.values()):
+        raise CouldNotConnectError("No source could be gathered.")
 
-    return last_tweet.id
+    texts = dict()
 
+    for key, result in results.items():
+        if result.status == SourceResult.FAILED:
+            texts[key] = None
+        elif result.status == SourceResult.STALE and not key.startswith("news/"):
+            texts[key] = f"{result.value}\n{get_stale_note(result.fetched_at, timezone)}"
+        else:
+            texts[key] = result.value
 
-# DAILY HEADER
+    news_list = list()
 
+    for key, text_list in texts.items():
+        if key.startswith("news/") and text_list:
+            website_name = NEWS_SOURCES[key[len("news/"):]].name
+            if results[key].status == SourceResult.STALE:
+                website_name = f"{website_name}\n{get_stale_note(results[key].fetched_at, timezone)}"
+            news_list.append((website_name, text_list))
 
-def get_daily_header(timezone):
-    """
-    Takes a timezone and returns a header for the daily tweets.
+    return (texts.get("currencies"), texts.get("stock_indexes"), news_list, get_daily_header(timezone, instant))
 
-    :param timezone: Desired timezone. (Timezones available at https://stackoverflow.com/q/13866926.)
 
-    :return: A formated string for the first tweet.
-    """
-    TIMEZONE = pytz.timezone(timezone)
-    now = datetime.datetime.now(TIMEZONE)
+def get_data(timezone, CURRENCY_CONVERTER_KEY, news_sources=None, deadline=DATA_DEADLINE):
+    """Gets every data bit needed from the web. A failing source is replaced by its last known good data or left out."""
+    results = gather_sources(get_data_sources(CURRENCY_CONVERTER_KEY, news_sources), deadline)
 
-    minute = now.minute
-    hour = now.hour
-    day = now.day
-    month = now.month
-    year = now.year
+    return compose_data(select_news(results), timezone)
 
-    if hour >= 0 and hour <= 11:
-        greeting = "Bom dia. "
-    #               Good morning
-    elif hour >= 12 and hour <= 17:
-        greeting = "Boa tarde. "
-    #               Good afternoon
-    elif hour >= 18 and hour <= 23:
-        greeting = "Boa noite. "
-    #               Good evening
-    else:
-        greeting = ""
 
-    header = (
-        f"{greeting}\n\nHoje é dia {day:0>2}/{month:0>2}/{year}.\n\n"
-        #               Today is the day
-        + f"Agora são {hour:0>2}h{minute:0>2} (GMT -04:00).\n\nAtualizações:"
-        #  It is (Timewise)               My local timezone   Updates
-    )
-    return header
+# SHARED FETCHING
 
 
-# CURRENCIES
+SHARED_FETCH_WINDOW = 5 * 60  # Seconds a news source gathered for one profile is reused by the others.
+SHARED_QUOTES_WINDOW = 60  # Seconds the quotes gathered for one profile are reused by the others.
 
 
-def get_currencies(CURRENCY_CONVERTER_KEY):
+class SharedFetcher:
     """
-    Returns a string with some currencies' prices in reais.
+    Gathers the sources for every profile, so profiles whose runs fall close together share the same requests.
 
-    :return: Formated string for the currencies reply.
+    A source gathered successfully is reused for a short window. A source being gathered for one
+    profile is not requested again for another one, which waits for the same result instead.
     """
-    CURRENCIES = {
-        "1 USD": "https://dolarhoje.com/",
-        "1 EUR": "https://dolarhoje.com/euro-hoje/",
-        "1 GBP": "https://dolarhoje.com/libra-hoje/",
-        "1 BTC": "https://dolarhoje.com/bitcoin-hoje/",
-        "1 NANO": "https://dolarhoje.com/nano-hoje/",
-        "1 g de ouro": "https://dolarhoje.com/ouro-hoje/",
-    }
 
-    PATTERN = re.compile(r"id=\"nacional\" value=\"(\d+,\d\d)\"")
+    def __init__(self, window=SHARED_FETCH_WINDOW, quotes_window=SHARED_QUOTES_WINDOW):
+        """
+        Takes how long the news and the quotes are reused.
+
+        :param window: Seconds a news source is reused. (SHARED_FETCH_WINDOW as default.)
+        :param quotes_window: Seconds the sources in QUOTE_SOURCES are reused. (SHARED_QUOTES_WINDOW as default.)
+        """
+        self.window = window
+        self.quotes_window = quotes_window
+        self._results = dict()  # key -> last SourceResult gathered successfully
+        self._pending = dict()  # key -> [threading.Event, SourceResult] of the sources being gathered
+        self._lock = threading.Lock()
+
+    def gather(self, functions, deadline=DATA_DEADLINE):
+        """
+        Takes the sources' functions and returns their results, gathering only the ones not recently or currently gathered.
+
+        :param functions: Dict of source key -> argumentless function, as returned by get_data_sources.
+        :param deadline: Seconds the sources have to finish. (DATA_DEADLINE as default.)
+
+        :return: Dict of source key -> SourceResult, in the same order, as returned by gather_sources.
+        """
+        results = dict()
+        own = dict()
+        waiting = dict()
+
+        with self._lock:
+            for key, function in functions.items():
+                result = self._results.get(key)
+                window = self.quotes_window if key in QUOTE_SOURCES else self.window
+
+                if result is not None and time.time() - result.fetched_at <= window:
+                    results[key] = result
+                    METRICS.increment("shared_fetch_total", source=key, result="reused")
+                elif key in self._pending:
+                    waiting[key] = self._pending[key]
+                    METRICS.increment("shared_fetch_total", source=key, result="joined")
+                else:
+                    own[key] = function
+                    self._pending[key] = [threading.Event(), None]
+                    METRICS.increment("shared_fetch_total", source=key, result="fetched")
 
-    final_text = ""
+        if own:
+            gathered = dict()
+            try:
+                gathered = gather_sources(own, deadline)
+            finally:
+                with self._lock:
+                    for key in own:
+                        pending = self._pending.pop(key)
+                        pending[1] = gathered.get(key)
+                        if pending[1] is not None and pending[1].status == SourceResult.OK:
+                            self._results[key] = pending[1]
+                        pending[0].set()
 
-    for currency, link in CURRENCIES.items():
-        response = requests.get(link, headers={"User-Agent": "Mozilla/5.0"})
-        response.raise_for_status()
-        value = re.search(PATTERN, response.text).group(1)
-        final_text += f"{currency}  -  R${value}\n"
+            results.update(gathered)
 
-    return final_text
+        for key, pending in waiting.items():
+            pending[0].wait(deadline)
+            result = pending[1]
+            if result is None:
+                result = get_fallback_result(key, TimeoutError(f"Not gathered by another profile after {deadline}s."))
+            results[key] = result
 
+        return {key: results[key] for key in functions}
 
-# STOCK INDEXES
 
+# PREFETCH
 
-@handle_http_error
-def get_stock_indexes():
-    """
-    Returns a string with some stocks' share prices.
 
-    :return: Formated string for the stock Indexes reply.
-    """
-    INDEXES = {
-        "IBOVESPA (BRL)": "https://br.investing.com/indices/bovespa",
-        "EWZ (USD)": "https://br.investing.com/etfs/ishares-brazil-index",
-        "S&P 500 (USD)": "https://br.investing.com/indices/us-spx-500",
-        "DIA (USD)": "https://br.investing.com/etfs/diamonds-trust",
-        "Brent Oil (USD)": "https://br.investing.com/commodities/brent-oil-opinion/",
-    }
+class Prefetcher:
+    """Gathers the data ahead of each scheduled run and keeps the snapshot until the run takes it."""
 
-    PATTERN = re.compile(
-        r"<span class=\"arial_26 inlineblock pid-\d+-last\" id=\"last_last\".*?>(.*?)</span>"
-    )
-    PATTERN_2 = re.compile(
-        r"<span class=(.*?)(green|red)Font(.*?)((\+|-)\d+(\.\d+)*,\d\d)(.*?)<\/span>"
-    )
-    PATTERN_3 = re.compile(
-        r"<span class=(.*?)(green|red)Font(.*?)((\+|-)\d+(\.\d+)*,\d\d%)(.*?)<\/span>"
-    )
+    def __init__(self, timezone, CURRENCY_CONVERTER_KEY, news_sources=None, sections=None, fetcher=None, seen=None):
+        """
+        Takes the timezone, the currency converter key, the news sources and sections passed on to get_data_sources, the fetcher and the SeenStore.
 
-    final_text = ""
+        :param timezone: Desired timezone. (Timezones available at https://stackoverflow.com/q/13866926.)
+        :param CURRENCY_CONVERTER_KEY: Currency converter's Api key.
+        :param news_sources: Optional list of NEWS_SOURCES keys. (ENABLED_NEWS_SOURCES as default.)
+        :param sections: Optional list of SECTIONS keys. (Every section as default.)
+        :param fetcher: Optional SharedFetcher shared with other profiles. (None as default, which calls gather_sources.)
+        :param seen: Optional SeenStore of the profile, so only new news are tweeted. (None as default.)
+        """
+        self.timezone = timezone
+        self.CURRENCY_CONVERTER_KEY = CURRENCY_CONVERTER_KEY
+        self.news_sources = news_sources
+        self.sections = sections
+        self.gather = gather_sources if fetcher is None else fetcher.gather
+        self.seen = seen
+        self._snapshots = dict()  # Scheduled instant -> dict of source key -> SourceResult
+        self._lock = threading.Lock()
+
+    def prefetch(self, instant):
+        """
+        Takes a scheduled instant and gathers its data.
 
-    for index, link in INDEXES.items():
-        response = requests.get(link, headers={"User-Agent": "Mozilla/5.0"})
-        response.raise_for_status()
-        value = re.search(PATTERN, response.text).group(1)
-        change = re.search(PATTERN_2, response.text).group(4)
-        change_percentage = re.search(PATTERN_3, response.text).group(4)
-        final_text += f"{index}  -  {value} ({change} | {change_percentage})\n"
+        :param instant: The scheduled instant, an aware datetime.
 
-    return final_text
+        :return: None
+        """
+        print(f"Prefetching data for {instant.astimezone(pytz.timezone(self.timezone)):%H:%M}...")
 
+        results = select_news(self.gather(get_data_sources(self.CURRENCY_CONVERTER_KEY, self.news_sources, self.sections)), self.seen)
 
-# NEWS
+        with self._lock:
+            for old_instant in [old_instant for old_instant in self._snapshots if old_instant < instant]:
+                del self._snapshots[old_instant]
+            self._snapshots[instant] = results
 
+    def refresh_quotes(self, instant):
+        """
+        Takes a scheduled instant and gathers its currencies and stock indexes again, if its data was prefetched.
 
-@handle_http_error
-def get_the_economist():
-    """
-    Returns a list with The Economist's first 5 news' links and titles.
+        Only the quotes gathered successfully replace the prefetched ones.
 
-    :return: List of strings with the first 5 news' links and titles found.
-    """
-    PATTERN = re.compile(
-        r"<a class=\"headline-link\" href=\"(.+?)\"><span.*?>(.+?)<\/span><\/a>"
-    )
+        :param instant: The scheduled instant, an aware datetime.
 
-    response = requests.get(
-        "https://economist.com", headers={"User-Agent": "Mozilla/5.0"}
-    )
-    response.raise_for_status()
-    matches = re.findall(PATTERN, response.text)
+        :return: None
+        """
+        with self._lock:
+            if instant not in self._snapshots:
+                return
 
-    text_list = list()
+        functions = get_data_sources(self.CURRENCY_CONVERTER_KEY, [], self.sections)
+        results = self.gather({key: function for key, function in functions.items() if key in QUOTE_SOURCES})
 
-    for i in range(5):
-        url = "https://economist.com" + matches[i][0]
-        short_url = shorten_url(url)
-        text = html.unescape(matches[i][1])
-        if len(text) >= 100:  # Used to keep tweets under 144 characters.
-            text = text[:98] + "..."
-        text_list.append(f"{text}\n\n{short_url}")
+        with self._lock:
+            if instant in self._snapshots:
+                for key, result in results.items():
+                    if result.status == SourceResult.OK:
+                        self._snapshots[instant][key] = result
 
-    return text_list
+    def take(self, instant):
+        """
+        Takes a scheduled instant and returns its data, gathering it now if it was not prefetched.
 
+        The news taken are stored as seen, so the following runs pass over them.
 
-@handle_http_error
-def get_the_wall_street_journal():
-    """
-    Returns a list with The Wall Street Journal's first 5 news' links and titles.
+        :param instant: The scheduled instant, an aware datetime.
 
-    :return: List of strings with the first 5 news' links and titles found.
-    """
-    PATTERN = re.compile(r"<a class=\"\" href=\"(https://www.wsj.com/articles/.*?)\"><span class=\"WSJTheme--headlineText--He1ANr9C \">(.*?)</span></a>")
+        :return: The same tuple returned by get_data, with the header set to the scheduled instant.
+        """
+        with self._lock:
+            results = self._snapshots.pop(instant, None)
 
-    response = requests.get(
-        "https://www.wsj.com/", headers={"User-Agent": "Mozilla/5.0"}
-    )
-    response.raise_for_status()
-    matches = re.findall(PATTERN, response.text)
+        if results is None:
+            print("Gathering data...")
+            results = select_news(self.gather(get_data_sources(self.CURRENCY_CONVERTER_KEY, self.news_sources, self.sections)), self.seen)
 
-    text_list = list()
+        data = compose_data(results, self.timezone, instant)
 
-    for i in range(5):
-        url = matches[i][0]
-        short_url = shorten_url(url)
-        text = html.unescape(matches[i][1])
-        if len(text) >= 100:  # Used to keep tweets under 144 characters.
-            text = text[:98] + "..."
-        text_list.append(f"{text}\n\n{short_url}")
+        if self.seen is not None:
+            for key, result in results.items():
+                if result.items:
+                    self.seen.add(key, result.items)
 
-    return text_list
+        return data
 
 
-@handle_http_error
-def get_o_antagonista():
-    """
-    Returns a list with O Antagonista's first 5 news' links and titles.
+# PROFILES
 
-    :return: List of strings with the first 5 news' links and titles found.
-    """
-    PATTERN = re.compile(
-        r"<div class=\"article_link\">.*\n.*<a href=\"(.+?)\" title=\"(.+?)\".*class=\"link_post\">"
-    )
 
-    response = requests.get(
-            "https://www.oantagonista.com", headers={"User-Agent": "Mozilla/5.0"}
-    )
-    response.raise_for_status()
-    matches = re.findall(PATTERN, response.text)
+JOURNAL_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "journals")
+JOURNAL_RESUME_WINDOW = 60 * 60  # Seconds after its scheduled instant an unfinished thread is still resumed.
 
-    text_list = list()
 
-    for i in range(5):
-        url = matches[i][0]
-        short_url = shorten_url(url)
-        text = html.unescape(matches[i][1])
-        if len(text) >= 100:  # Used to keep tweets under 144 characters.
-            text = text[:98] + "..."
-        text_list.append(f"{text}\n\n{short_url}")
+class Profile:
+    """One account the bot tweets for: its credentials, timezone, schedule and sections."""
 
-    return text_list
+    def __init__(
+            self, username, timezone, API_KEY, API_SECRET_KEY, ACCESS_TOKEN, ACCESS_TOKEN_SECRET, schedule=None, news_sources=None, sections=None, only_new_news=True,
+    ):
+        """
+        Takes the account's username, timezone, Twitter's credentials, schedule and sections.
 
+        :param username: Twitter account username without @.
+        :param timezone: Desired timezone. (Timezones available at https://stackoverflow.com/q/13866926.)
+        :param API_KEY: Twitter's Api key.
+        :param API_SECRET_KEY: Twitter's Api secret key.
+        :param ACCESS_TOKEN: Twitter's Api access token.
+        :param ACCESS_TOKEN_SECRET: Twitter's Api access token secret.
+        :param schedule: List of tuples with the hour and the minute. (None as default, which requests it at startup.)
+        :param news_sources: Optional list of NEWS_SOURCES keys to be tweeted. (ENABLED_NEWS_SOURCES as default.)
+        :param sections: Optional list of SECTIONS keys to be tweeted. (Every section as default.)
+        :param only_new_news: Whether news already tweeted by the account are passed over. (True as default.)
+        """
+        self.username = username
+        self.timezone = timezone
+        self.credentials = (API_KEY, API_SECRET_KEY, ACCESS_TOKEN, ACCESS_TOKEN_SECRET)
+        self.schedule = schedule
+        self.news_sources = news_sources
+        self.sections = sections
+        self.only_new_news = only_new_news
 
-@handle_http_error
-def get_insurgere():
+
+class ProfileRunner:
     """
-    Returns a list with Insurgere's first 5 news' links and titles.
+    Runs a profile's jobs one at a time on its own thread, with its own clients and posting scheduler.
 
-    :return: List of strings with the first 5 news' links and titles found.
+    The Scheduler only queues the jobs, so a profile slowed down by its rate limit or its sources
+    never delays the runs of the other profiles, and a profile whose job fails stops alone.
     """
-    PATTERN = re.compile(
-        r"<h2 class=\"entry-title\"><a href=\"(.+?)\" rel=\"bookmark\">(.+?)<\/a><\/h2>"
-    )
 
-    headers = {
-        "User-agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_9_3) AppleWebKit/537.75.14 (KHTML, like Gecko) Version/7.0.3 Safari/7046A194A"
-    }
-    response = requests.get("https://insurgere.com.br", headers=headers)
-    response.raise_for_status()
-    matches = re.findall(PATTERN, response.text)
+    def __init__(self, profile, clients, prefetcher, on_error, journal=None):
+        """
+        Takes the profile, its ClientManager, its Prefetcher, the function called when a job fails and its journal.
+
+        :param profile: Desired Profile.
+        :param clients: The profile's ClientManager.
+        :param prefetcher: The profile's Prefetcher.
+        :param on_error: Function called with the profile and the exception when a job raises. The runner is stopped before.
+        :param journal: Optional ThreadJournal of the profile, so an interrupted thread is resumed. (None as default.)
+        """
+        self.profile = profile
+        self.clients = clients
+        self.prefetcher = prefetcher
+        self.on_error = on_error
+        self.journal = journal
+        self.posting_scheduler = PostingScheduler()
+        self._queue = queue.Queue()  # (function, instant) of the jobs due.
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._work, name=f"infobot @{profile.username}", daemon=True)
+
+    def start(self):
+        """Starts the runner's thread."""
+        self._thread.start()
+
+    @property
+    def running(self):
+        """Whether the runner still runs its jobs, which it stops doing after one of them raises."""
+        return not self._stopped.is_set()
+
+    def submit(self, function):
+        """Takes a job's function and returns a callback that queues it on the runner's thread, unless the runner stopped."""
+        def callback(instant):
+            if self.running:
+                self._queue.put((function, instant))
+
+        return callback
+
+    def _work(self):
+        """Runs the queued jobs in order until one of them raises."""
+        while True:
+            function, instant = self._queue.get()
+            try:
+                function(instant)
+            except Exception as error:
+                self._stopped.set()
+                self.on_error(self.profile, error)
+                return
 
-    text_list = list()
+    def schedule(self, scheduler, prefetch_lead, quotes_refresh_lead=None):
+        """
+        Takes a Scheduler and adds the profile's thread and prefetching jobs to it.
 
-    for i in range(5):
-        url = matches[i][0]
-        short_url = shorten_url(url)
-        text = html.unescape(matches[i][1])
-        if len(text) >= 100:  # Used to keep tweets under 144 characters.
-            text = text[:98] + "..."
-        text_list.append(f"{text}\n\n{short_url}")
+        :param scheduler: Desired Scheduler.
+        :param prefetch_lead: Seconds before each run the data is gathered.
+        :param quotes_refresh_lead: Seconds before each run the quotes are gathered again. (None as default, which disables it.)
 
-    return text_list
+        :return: None
+        """
+        name = "@" + self.profile.username
+        schedule, timezone = self.profile.schedule, self.profile.timezone
 
+        scheduler.add_daily(name + " prefetch", schedule, timezone, self.submit(self.prefetcher.prefetch), offset=-prefetch_lead)
+        if quotes_refresh_lead is not None:
+            scheduler.add_daily(
+                name + " quotes refresh", schedule, timezone, self.submit(self.prefetcher.refresh_quotes), offset=-quotes_refresh_lead
+            )
+        scheduler.add_daily(name + " thread", schedule, timezone, self.submit(self.run))
 
-@handle_http_error
-def get_hacker_news():
-    """
-    Returns a list with The Hacker News's 5 most voted news' links and titles.
+    def resume(self):
+        """
+        Queues the thread left unfinished by the previous process, if it is recent enough, to be posted with its saved data.
 
-    :return: List of strings with the most voted 5 news' links and titles found.
-    """
-    PATTERN = re.compile(r"(<tr class=\'athing\' id=\'\d+\'>.*?\n.*?\n.*?<\/td><\/tr>)")
-    LINK_AND_TITLE_PATTERN = re.compile(
-        r"<a href=\"(.+?)\" class=\"storylink\">(.+?)<\/a>"
-    )
-    VOTES_PATTERN = re.compile(r"(\d+) points")
+        :return: None
+        """
+        unfinished = None if self.journal is None else self.journal.unfinished()
+        if unfinished is None:
+            return
 
-    response = requests.get(
-        "https://news.ycombinator.com/news", headers={"User-Agent": "Mozilla/5.0"}
-    )
-    response.raise_for_status()
-    matches = re.findall(PATTERN, response.text)
+        instant, data = unfinished
+        age = time.time() - instant.timestamp()
 
-    matches_list = list()
+        if age > JOURNAL_RESUME_WINDOW:
+            print(f"Dropping @{self.profile.username}'s unfinished thread of {instant:%Y-%m-%d %H:%M} UTC, {age:.0f}s old.")
+            self.journal.finish()
+            return
 
-    for i in matches:
-        try:
-            link_and_title_matches = re.search(LINK_AND_TITLE_PATTERN, i)
-            link = link_and_title_matches.group(1)
-            title = link_and_title_matches.group(2)
-            votes = re.search(VOTES_PATTERN, i).group(1)
-            matches_list.append({"title": title, "link": link, "votes": votes})
-        except AttributeError:
-            pass
+        print(f"Resuming @{self.profile.username}'s unfinished thread of {instant:%Y-%m-%d %H:%M} UTC...")
+        self._queue.put((functools.partial(self.post_thread, data=data), instant))
 
-    matches_list = sorted(matches_list, key=lambda x: int(x["votes"]), reverse=True)
+    def run(self, instant):
+        """
+        Takes a scheduled instant, takes its data and posts its thread.
 
-    text_list = list()
+        :param instant: The scheduled instant, an aware datetime.
 
-    for i in range(5):
-        url = matches_list[i]["link"]
-        if url[:4] != "http":
-            url = "https://news.ycombinator.com/" + url
-        short_url = shorten_url(url)
-        text = html.unescape(matches_list[i]["title"])
-        votes = matches_list[i]["votes"]
-        text = f"({votes} votos) {text}"
-        if len(text) >= 100:  # Used to keep tweets under 144 characters.
-            text = text[:98] + "..."
-        text_list.append(f"{text}\n\n{short_url}")
+        :return: None
+        """
+        local_time = instant.astimezone(pytz.timezone(self.profile.timezone))
+        print(f"It's {local_time.hour}:{local_time.minute:0>2} for @{self.profile.username}! Starting...")
 
-    return text_list
+        # GETTING DATA
 
+        with METRICS.timer("data_ready_seconds", profile=self.profile.username):
+            data = self.prefetcher.take(instant)
 
-def get_every_news_and_name():
-    """
-    Returns a list of tuples with websites and news lists.
+        if self.journal is not None:
+            self.journal.begin(instant, data)
 
-    :return: List of tuples with the first element being a string with the website name and the second a list with the news.
-    """
-    the_economist_list = get_the_economist()
-    the_wall_street_journal_list = get_the_wall_street_journal()
-    #o_antagonista_list = get_o_antagonista()
-    #insurgere_list = get_insurgere()
-    hacker_news_list = get_hacker_news()
+        self.post_thread(instant, data)
 
-    websites_list = [
-        ("The Economist", the_economist_list),
-        ("The Wall Street Journal", the_wall_street_journal_list),
-        #("O Antagonista", o_antagonista_list),
-        #("Insurgere", insurgere_list),
-        ("Hacker News", hacker_news_list),
-    ]
+    def post_thread(self, instant, data):
+        """
+        Takes a scheduled instant and its data and posts its thread, skipping the posts the journal has as posted.
 
-    return websites_list
+        :param instant: The scheduled instant, an aware datetime.
+        :param data: Tuple returned by get_data.
 
+        :return: None
+        """
+        username = self.profile.username
+        currencies_text, stock_indexes_text, news_list, daily_header = data
 
-# GET DATA
+        # TWEETING
 
+        print(f"Tweeting as @{username}...")
+        throttled_before = self.posting_scheduler.throttled
+        thread_builder = ThreadBuilder(self.clients.twitter, username, self.posting_scheduler, self.journal)
+        with METRICS.timer("thread_post_seconds", profile=username):
+            thread_builder.build(daily_header, currencies_text, stock_indexes_text, news_list)
+        if thread_builder.header_posted_at is not None:
+            METRICS.observe("header_lateness_seconds", thread_builder.header_posted_at - instant.timestamp(), profile=username)
+        print(f"Throttled for {self.posting_scheduler.throttled - throttled_before:.1f}s by @{username}'s rate limit.")
 
-def get_data(timezone, CURRENCY_CONVERTER_KEY):
-    """Gets every data bit needed from the web and handles http errors."""
-    for _ in range(5):
-        try:
-            currencies_text = get_currencies(CURRENCY_CONVERTER_KEY)
-            stock_indexes_text = get_stock_indexes()
-            news_list = get_every_news_and_name()
-            daily_header = get_daily_header(timezone=timezone)
-        except CouldNotConnectError:
-            time.sleep(300)
-        else:
-            break
-    else:
-        raise Exception("Timed out.")
-    return (currencies_text, stock_indexes_text, news_list, daily_header)
+        if self.journal is not None:
+            self.journal.finish()
+
+        print(f"Everything went well for @{username}. Waiting for next iteration...")
 
 
 # TWEET EVERYTHING
@@ -697,35 +3486,271 @@ def request_schedule_input():
     return sorted(list(set(schedule)))
 
 
-# SKIPS
+SCHEDULE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "schedule.json")
+SCHEDULE_VARIABLE = "INFOBOT_SCHEDULE"  # Environment variable with a schedule for every profile, such as "7:00,19:30".
 
 
-def get_skips_needed(schedule, timezone):
+def parse_schedule(text):
     """
-    Takes the tweet schedule and the timezone and returns how many time marks should be skipped.
+    Takes a schedule written as comma separated times, such as "7:00,19:30", and returns it as a list.
 
-    :param schedule: List generated with the request_schedule_input function.
+    :param text: Desired string. The minutes may be left out, as in "7,19".
+
+    :return: A sorted list of tuples with the hour and the minute, like request_schedule_input's.
+    """
+    schedule = list()
+
+    for mark in text.split(","):
+        hour, _, minute = mark.strip().partition(":")
+        hour, minute = int(hour), int(minute or 0)
+        if not (0 <= hour < 24 and 0 <= minute < 60):
+            raise ValueError(f"Invalid time in the schedule: {mark.strip()}.")
+        schedule.append((hour, minute))
+
+    return sorted(set(schedule))
+
+
+def load_schedule(username):
+    """
+    Takes a profile's username and returns its schedule without asking for it, when possible.
+
+    The schedule is read from the SCHEDULE_VARIABLE environment variable or else from the profile's
+    entry in SCHEDULE_FILE. Only when neither has it, it is requested on the terminal and saved to
+    the file, so a restarted process does not ask again. A corrupted file or entry is ignored.
+
+    :param username: Twitter account username without @.
+
+    :return: A sorted list of tuples with the hour and the minute.
+    """
+    if os.environ.get(SCHEDULE_VARIABLE):
+        return parse_schedule(os.environ[SCHEDULE_VARIABLE])
+
+    try:
+        with open(SCHEDULE_FILE, encoding="utf-8") as file:
+            schedules = json.load(file)
+    except FileNotFoundError:
+        schedules = dict()
+    except (OSError, ValueError) as error:
+        print(f"Ignoring {SCHEDULE_FILE}, which could not be read: {error!r}")
+        schedules = dict()
+
+    if not isinstance(schedules, dict):
+        print(f"Ignoring {SCHEDULE_FILE}, which is not a schedule file.")
+        schedules = dict()
+
+    if username in schedules:
+        try:
+            return sorted((int(hour), int(minute)) for hour, minute in schedules[username])
+        except (TypeError, ValueError):
+            print(f"Ignoring the corrupted schedule of @{username} in {SCHEDULE_FILE}.")
+
+    print(f"Schedule of @{username}:")
+    schedules[username] = request_schedule_input()
+
+    temporary_path = SCHEDULE_FILE + ".tmp"
+    with open(temporary_path, "w", encoding="utf-8") as file:
+        json.dump(schedules, file, indent=4)
+    os.replace(temporary_path, SCHEDULE_FILE)
+
+    return schedules[username]
+
+
+# SCHEDULER
+
+
+class SystemClock:
+    """The clock used by the Scheduler. Replace it by an object with the same methods to control time in tests."""
+
+    def now(self):
+        """Returns the current time as an aware datetime in UTC."""
+        return datetime.datetime.now(pytz.utc)
+
+    def monotonic(self):
+        """Returns seconds of a clock that never goes backwards."""
+        return time.monotonic()
+
+    def sleep(self, seconds):
+        """Sleeps for the given seconds."""
+        time.sleep(seconds)
+
+
+def localize(TIMEZONE, naive_datetime):
+    """
+    Takes a pytz timezone and a naive local datetime and returns it as an aware datetime, resolving DST transitions.
+
+    An ambiguous time (when the clocks go back) resolves to its first occurrence and a nonexistent
+    time (when the clocks go forward) is moved forward by the size of the gap.
+
+    :param TIMEZONE: A pytz timezone.
+    :param naive_datetime: A datetime without tzinfo, in the timezone's local time.
+
+    :return: An aware datetime.
+    """
+    try:
+        return TIMEZONE.localize(naive_datetime, is_dst=None)
+    except pytz.exceptions.AmbiguousTimeError:
+        return TIMEZONE.localize(naive_datetime, is_dst=True)
+    except pytz.exceptions.NonExistentTimeError:
+        return TIMEZONE.normalize(TIMEZONE.localize(naive_datetime, is_dst=False))
+
+
+def get_next_instant(schedule, timezone, after):
+    """
+    Takes a daily schedule, a timezone and an instant, and returns the first scheduled instant strictly after it.
+
+    :param schedule: List of tuples with the hour and the minute, as returned by request_schedule_input.
     :param timezone: Desired timezone. (Timezones available at https://stackoverflow.com/q/13866926.)
+    :param after: An aware datetime.
 
-    :return: An int with the needed amount of time marks to be skipped in order to execute the next one in time order.
+    :return: An aware datetime in UTC.
     """
     TIMEZONE = pytz.timezone(timezone)
-    current_time = datetime.datetime.now(TIMEZONE)
-    current_hour_and_minute = (current_time.hour, current_time.minute)
+    date = after.astimezone(TIMEZONE).date()
 
-    if current_hour_and_minute in schedule:
-        current_index = schedule.index(current_hour_and_minute) + 1
-        comparison_list = list()
-    else:
-        comparison_list = schedule.copy()
-        comparison_list.append(current_hour_and_minute)
-        comparison_list.sort()
-        current_index = comparison_list.index(current_hour_and_minute)
+    while True:
+        for hour, minute in sorted(schedule):
+            instant = localize(TIMEZONE, datetime.datetime(date.year, date.month, date.day, hour, minute))
+            if instant > after:
+                return instant.astimezone(pytz.utc)
+        date += datetime.timedelta(days=1)
 
-    if (current_index == 0) or (current_index == len(comparison_list)):
-        return 0
-    else:
-        return current_index
+
+class Job:
+    """A callback that runs on a daily schedule in a timezone, optionally some seconds before or after each scheduled time."""
+
+    def __init__(self, name, schedule, timezone, callback, offset=0):
+        """
+        Takes a name, a daily schedule, a timezone, the function to be called and an offset.
+
+        :param name: Name used in the logs.
+        :param schedule: List of tuples with the hour and the minute, as returned by request_schedule_input.
+        :param timezone: Desired timezone. (Timezones available at https://stackoverflow.com/q/13866926.)
+        :param callback: Function called with the scheduled instant (an aware datetime in UTC), not shifted by the offset.
+        :param offset: Seconds the job runs after each scheduled time. Negative to run before it. (0 as default.)
+        """
+        self.name = name
+        self.schedule = schedule
+        self.timezone = timezone
+        self.callback = callback
+        self.offset = datetime.timedelta(seconds=offset)
+
+    def next_instant(self, after):
+        """Takes an aware datetime and returns the job's first run strictly after it, shifted by the offset."""
+        return get_next_instant(self.schedule, self.timezone, after - self.offset) + self.offset
+
+
+class Scheduler:
+    """
+    Runs jobs at absolute instants kept in a priority queue.
+
+    The instants are computed in each job's timezone, so they stay right across days and DST
+    transitions, and the waiting is done on the monotonic clock in bounded steps, re-reading the
+    wall clock after each one to correct any drift.
+    """
+
+    def __init__(self, clock=None, max_sleep=60, misfire_grace=5 * 60):
+        """
+        Takes the clock, the longest single sleep and the tolerance for late runs.
+
+        :param clock: Object with now, monotonic and sleep methods. (A SystemClock as default.)
+        :param max_sleep: Longest sleep, in seconds, before the wall clock is checked again. (60 as default.)
+        :param misfire_grace: Seconds a run may be late and still happen. Later runs are skipped. (300 as default.)
+        """
+        self.clock = SystemClock() if clock is None else clock
+        self.max_sleep = max_sleep
+        self.misfire_grace = misfire_grace
+        self._queue = list()  # Heap of (instant, sequence, job).
+        self._sequence = 0  # Untie jobs with the same instant by the order they were added.
+        self._stopped = threading.Event()
+        self._error = None  # Exception raised by run_forever once stopped.
+
+    def _push(self, instant, job):
+        """Adds a job's run to the queue."""
+        heapq.heappush(self._queue, (instant, self._sequence, job))
+        self._sequence += 1
+
+    def add(self, job):
+        """
+        Takes a Job and schedules its next run from now.
+
+        :param job: Desired Job.
+
+        :return: The Job given.
+        """
+        self._push(job.next_instant(self.clock.now()), job)
+        return job
+
+    def add_daily(self, name, schedule, timezone, callback, offset=0):
+        """Creates a Job with the arguments given, schedules it and returns it."""
+        return self.add(Job(name, schedule, timezone, callback, offset))
+
+    def next_run(self):
+        """Returns the instant of the next run, or None if there are no jobs."""
+        return self._queue[0][0] if self._queue else None
+
+    def sleep_until(self, instant):
+        """
+        Takes an aware datetime and sleeps until it.
+
+        :param instant: Desired instant.
+
+        :return: None
+        """
+        while not self._stopped.is_set():
+            remaining = (instant - self.clock.now()).total_seconds()
+            if remaining <= 0:
+                return
+
+            deadline = self.clock.monotonic() + min(remaining, self.max_sleep)
+            while True:
+                left = deadline - self.clock.monotonic()
+                if left <= 0:
+                    break
+                self.clock.sleep(left)
+
+    def run_pending(self):
+        """
+        Runs every job whose instant has come and schedules its following run.
+
+        :return: Int with the amount of jobs run.
+        """
+        runs = 0
+
+        while self._queue and self._queue[0][0] <= self.clock.now():
+            instant, _, job = heapq.heappop(self._queue)
+            self._push(job.next_instant(instant), job)
+
+            lateness = (self.clock.now() - instant).total_seconds()
+            METRICS.observe("job_lateness_seconds", lateness, job=job.name)
+            if lateness > self.misfire_grace:
+                print(f"Skipping {job.name} scheduled for {instant:%Y-%m-%d %H:%M} UTC, {lateness:.0f}s late.")
+                continue
+
+            job.callback(instant - job.offset)
+            runs += 1
+
+        return runs
+
+    def stop(self, error=None):
+        """
+        Makes run_forever return, within max_sleep seconds, from any thread.
+
+        :param error: Optional exception raised by run_forever instead of returning. (None as default.)
+
+        :return: None
+        """
+        self._error = error
+        self._stopped.set()
+
+    def run_forever(self):
+        """Sleeps until each run and runs the jobs, until stopped."""
+        while not self._stopped.is_set():
+            self.sleep_until(self.next_run())
+            if not self._stopped.is_set():
+                self.run_pending()
+
+        if self._error is not None:
+            raise self._error
 
 
 # CALLING MAIN FUNCTION